@@ -1,12 +1,18 @@
 import os
+import sys
 from txdxai.app import create_app
 from txdxai.extensions import db
 
 app = create_app()
 
-with app.app_context():
-    db.create_all()
-    print("Database tables created successfully!")
+# Schema creation is a one-shot init step (TXDXAI_INIT_DB=1 python run.py --init-only);
+# regular starts rely on `flask db upgrade` and skip the metadata round trips
+if os.environ.get('TXDXAI_INIT_DB') == '1':
+    with app.app_context():
+        db.create_all()
+        print("Database tables created successfully!")
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    if '--init-only' in sys.argv:
+        sys.exit(0)
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv('FLASK_ENV') == 'development')
@@ -1,10 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from cachetools import TLRUCache, TTLCache
+import orjson
+import msgspec
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+import atexit
+import base64
+import hashlib
+import hmac
+import queue
+import threading
+import time
 import logging
+from logging.handlers import MemoryHandler
+import re
 import sys
 import os
-from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Type, TypeVar
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,9 +28,17 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config import config, config_cache
 from sophia.agent_loader import agent_loader
+from sophia.backend import backend_session
 from sophia.memory import memory_manager
 from sophia.intent_router import intent_router
 from sophia.handoff import create_ticket_stub
+from sophia.schemas import (
+    ChatRequest,
+    ConfigTestRequest,
+    CacheInvalidateRequest,
+    AuditEvent,
+    ChatAuditPayload
+)
 from sophia.mock_integrations import (
     get_palo_alto_alerts,
     get_splunk_logs,
@@ -25,33 +48,244 @@ from sophia.mock_integrations import (
     execute_security_action
 )
 
+# Log records are buffered and written in batches instead of one write per
+# line. Warnings and errors flush right away, and a background flush keeps
+# info lines at most LOG_FLUSH_INTERVAL_SECONDS late. DEBUG writes unbuffered
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_buffer = MemoryHandler(capacity=256, flushLevel=logging.WARNING, target=_log_handler)
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    handlers=[_log_handler if config.DEBUG else _log_buffer]
 )
 logger = logging.getLogger(__name__)
 
+
+def _flush_logs_periodically():
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL_SECONDS)
+        _log_buffer.flush()
+
+
+if not config.DEBUG:
+    threading.Thread(target=_flush_logs_periodically, name='sophia-log-flush', daemon=True).start()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used by jsonify and request.get_json"""
+    
+    option = orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
+
 app = Flask(__name__)
-CORS(app, origins=config.CORS_ORIGINS.split(','))
+app.json = OrjsonProvider(app)
+CORS(app, origins=list(config.CORS_ORIGINS_LIST))
+
+
+def _prewarm_backend_pool():
+    """Open a pooled connection to the backend before the first request needs it"""
+    backend = urlsplit(config.BACKEND_URL)
+    try:
+        backend_session.get(f"{backend.scheme}://{backend.netloc}/health", timeout=2)
+    except Exception as e:
+        logger.warning(f"Backend pre-warm failed: {e}")
+
+
+threading.Thread(target=_prewarm_backend_pool, name='sophia-prewarm', daemon=True).start()
+
+# Validated agent credentials, keyed by (company_id, sha256 of the access key)
+# so raw keys are never kept in memory. Entries live for AUTH_CACHE_TTL_SECONDS
+# at most, and never past the exp of the service token they hold
+AUTH_CACHE_TTL_SECONDS = 60
+_auth_cache: TLRUCache = TLRUCache(
+    maxsize=10_000,
+    ttu=lambda key, auth_data, now: now + _auth_cache_ttl(auth_data['access_token'])
+)
+_auth_cache_lock = threading.Lock()
+
+# Agent instance metadata from the legacy /agents/instance fallback
+INSTANCE_CACHE_TTL_SECONDS = 300
+_instance_cache: TTLCache = TTLCache(maxsize=2048, ttl=INSTANCE_CACHE_TTL_SECONDS)
+_instance_cache_lock = threading.Lock()
+
+# Worker pool for fanning out the independent security tool lookups of a query
+TOOL_TIMEOUT_SECONDS = 5
+tool_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='sophia-tools')
+
+# Security tool triggers, found as substrings in a single scan of the message.
+# The lookahead reports overlapping hits ("catalog" -> "log"), and "alert" also
+# covers the Spanish "alerta".
+_TOOL_KEYWORD_RE = re.compile(
+    r'(?=(alert|palo|log|splunk|metric|métrica|grafana|wazuh|meraki|network|red))',
+    re.IGNORECASE
+)
+_KEYWORD_BITS = {
+    keyword: 1 << bit
+    for bit, keyword in enumerate(
+        ('alert', 'palo', 'log', 'splunk', 'metric', 'métrica', 'grafana', 'wazuh', 'meraki', 'network', 'red')
+    )
+}
+_TOOL_KEYWORD_MASKS = {
+    'palo_alto': _KEYWORD_BITS['alert'] | _KEYWORD_BITS['palo'],
+    'splunk': _KEYWORD_BITS['log'] | _KEYWORD_BITS['splunk'],
+    'grafana': _KEYWORD_BITS['metric'] | _KEYWORD_BITS['métrica'] | _KEYWORD_BITS['grafana'],
+    'wazuh': _KEYWORD_BITS['wazuh'],
+    'meraki': _KEYWORD_BITS['meraki'] | _KEYWORD_BITS['network'] | _KEYWORD_BITS['red']
+}
+
+# Agent instance fields handed to agent_loader.initialize_agent
+_AZURE_CONFIG_KEYS = (
+    'azure_project_id',
+    'azure_agent_id',
+    'azure_vector_store_id',
+    'azure_openai_endpoint',
+    'azure_openai_key',
+    'azure_openai_deployment',
+    'azure_search_endpoint',
+    'azure_search_key'
+)
+
+# Request body schema type accepted by parse_body
+T = TypeVar('T')
+
+
+def parse_body(request_type: Type[T]) -> Optional[T]:
+    """Decode and validate the JSON request body in one pass, or None if it is empty"""
+    raw = request.get_data(cache=False)
+    return msgspec.json.decode(raw, type=request_type) if raw else None
+
+
+@app.errorhandler(msgspec.DecodeError)
+def invalid_body(error):
+    """Reject malformed or invalid request bodies with a JSON 400"""
+    return jsonify({'error': str(error)}), 400
+
+
+# Configuration is read from the environment once at startup, so the health
+# payload never changes and is encoded a single time
+_HEALTH_BODY = orjson.dumps({
+    'status': 'healthy',
+    'service': 'SOPHIA',
+    'version': '2.0.0',
+    'architecture': 'modular',
+    'azure_ai_configured': config.is_azure_configured(),
+    'config': config.get_info()
+})
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'service': 'SOPHIA',
-        'version': '2.0.0',
-        'architecture': 'modular',
-        'azure_ai_configured': config.validate(),
-        'config': config.get_info()
-    }), 200
+    return Response(_HEALTH_BODY, status=200, mimetype='application/json')
+
+
+def _auth_cache_key(company_id: int, agent_access_key: str) -> Tuple[int, str]:
+    return company_id, hashlib.sha256(agent_access_key.encode('utf-8')).hexdigest()
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def _token_expiry(token: Optional[str]) -> Optional[float]:
+    """Read the exp claim of a JWT without verifying it"""
+    try:
+        exp = orjson.loads(_b64url_decode(token.split('.')[1])).get('exp')
+    except (AttributeError, IndexError, ValueError, TypeError, orjson.JSONDecodeError):
+        return None
+    return exp if isinstance(exp, (int, float)) else None
+
+
+def _auth_cache_ttl(access_token: Optional[str]) -> float:
+    """Seconds an auth result may stay cached"""
+    exp = _token_expiry(access_token)
+    if exp is None:
+        return AUTH_CACHE_TTL_SECONDS
+    return min(AUTH_CACHE_TTL_SECONDS, exp - time.time())
+
+
+def verify_service_token(company_id: int, token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify a backend-issued agent service JWT (HS256) without calling the backend
+    
+    Returns:
+        auth_data built from the token claims, or None if the token is not a
+        valid, unexpired SOPHIA token for this company
+    """
+    if not config.SOPHIA_SHARED_SECRET or token.count('.') != 2:
+        return None
+    
+    try:
+        header_b64, payload_b64, signature_b64 = token.split('.')
+        header = orjson.loads(_b64url_decode(header_b64))
+        if not isinstance(header, dict) or header.get('alg') != 'HS256':
+            return None
+        
+        expected = hmac.new(
+            config.SOPHIA_SHARED_SECRET.encode('utf-8'),
+            f"{header_b64}.{payload_b64}".encode('ascii'),
+            hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature_b64)):
+            return None
+        
+        claims = orjson.loads(_b64url_decode(payload_b64))
+    except (ValueError, TypeError, orjson.JSONDecodeError):
+        return None
+    
+    # The payload is signed but its shape is not guaranteed; reject anything
+    # that isn't a claims object with numeric times and a scope list
+    if not isinstance(claims, dict):
+        return None
+    exp = claims.get('exp', 0)
+    nbf = claims.get('nbf', 0)
+    scopes = claims.get('scopes', [])
+    if not isinstance(exp, (int, float)) or not isinstance(nbf, (int, float)) or not isinstance(scopes, list):
+        return None
+    
+    now = time.time()
+    if exp <= now or nbf > now:
+        return None
+    if str(claims.get('company_id')) != str(company_id):
+        return None
+    if claims.get('agent_type') != 'SOPHIA' or 'agent:invoke' not in scopes:
+        return None
+    
+    return {
+        'access_token': token,
+        'agent_instance_id': claims.get('agent_instance_id'),
+        'agent_instance': {}
+    }
 
 
 def validate_agent_access(company_id: int, agent_access_key: str) -> Optional[Dict[str, Any]]:
-    """Validate agent access key with backend"""
+    """Validate agent access key with backend (cached for AUTH_CACHE_TTL_SECONDS)"""
+    auth_data = verify_service_token(company_id, agent_access_key)
+    if auth_data:
+        return auth_data
+    
+    cache_key = _auth_cache_key(company_id, agent_access_key)
+    with _auth_cache_lock:
+        cached = _auth_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        response = requests.post(
+        response = backend_session.post(
             f"{config.BACKEND_URL}/agents/auth/token",
             json={
                 'companyId': company_id,
@@ -63,54 +297,204 @@ def validate_agent_access(company_id: int, agent_access_key: str) -> Optional[Di
         
         if response.status_code == 200:
             data = response.json()
-            return {
+            auth_data = {
                 'access_token': data.get('access_token'),
                 'agent_instance_id': data.get('agent_instance_id'),
                 'agent_instance': data.get('agent_instance', {})
             }
+            if _auth_cache_ttl(auth_data['access_token']) > 0:
+                with _auth_cache_lock:
+                    _auth_cache[cache_key] = auth_data
+            if auth_data['agent_instance']:
+                # The backend sent fresh metadata; don't serve an older copy
+                with _instance_cache_lock:
+                    _instance_cache.pop(auth_data['agent_instance_id'], None)
+            return auth_data
         return None
     except Exception as e:
         logger.error(f"Auth validation error: {e}")
         return None
 
 
+def invalidate_agent_access(company_id: Optional[int] = None, auth_token: Optional[str] = None):
+    """Drop cached credentials for a company, for a rejected token, or all of them"""
+    with _auth_cache_lock:
+        if company_id is None and auth_token is None:
+            _auth_cache.clear()
+            return
+        stale = [
+            key for key, auth_data in _auth_cache.items()
+            if key[0] == company_id or (auth_token and auth_data['access_token'] == auth_token)
+        ]
+        for key in stale:
+            _auth_cache.pop(key, None)
+
+
 def get_agent_instance(agent_instance_id: str) -> Optional[Dict[str, Any]]:
-    """Get agent instance details from backend (fallback)"""
+    """Get agent instance details from backend (fallback, cached)"""
+    with _instance_cache_lock:
+        cached = _instance_cache.get(agent_instance_id)
+    if cached is not None:
+        return cached
+    
     try:
-        response = requests.get(
+        response = backend_session.get(
             f"{config.BACKEND_URL}/agents/instance/{agent_instance_id}",
             timeout=10
         )
         
         if response.status_code == 200:
-            return response.json()
+            agent_instance = response.json()
+            with _instance_cache_lock:
+                _instance_cache[agent_instance_id] = agent_instance
+            return agent_instance
         return None
     except Exception as e:
         logger.error(f"Error fetching agent instance: {e}")
         return None
 
 
-def log_audit(action: str, entity_type: str, entity_id: str, payload: Dict, auth_token: str):
-    """Log action to backend audit system"""
+def invalidate_agent_instances(company_id: Optional[int] = None):
+    """Drop cached instance metadata for a company, or all of it"""
+    with _instance_cache_lock:
+        if company_id is None:
+            _instance_cache.clear()
+            return
+        stale = [
+            instance_id for instance_id, agent_instance in _instance_cache.items()
+            if agent_instance.get('company_id') == company_id
+        ]
+        for instance_id in stale:
+            _instance_cache.pop(instance_id, None)
+
+
+def _post_audit(auth_token: str, events: List[AuditEvent]):
+    """Send audit events to the backend, as one /agents/audit/batch call when possible"""
+    global _audit_batch_supported
+    
+    headers = {
+        'Authorization': f'Bearer {auth_token}',
+        'Content-Type': 'application/json'
+    }
+    
+    # Events handed to the backend so far; the rest are lost on failure
+    attempted = 0
     try:
-        requests.post(
-            f"{config.BACKEND_URL}/audit",
-            headers={'Authorization': f'Bearer {auth_token}'},
-            json={
-                'action': action,
-                'entity_type': entity_type,
-                'entity_id': entity_id,
-                'payload': payload
-            },
-            timeout=5
-        )
-    except:
-        pass
+        if len(events) > 1 and _audit_batch_supported:
+            response = backend_session.post(
+                f"{config.BACKEND_URL}/agents/audit/batch",
+                headers=headers,
+                data=_audit_encoder.encode(events),
+                timeout=5
+            )
+            if response.status_code != 404:
+                if response.status_code == 401:
+                    invalidate_agent_access(auth_token=auth_token)
+                if not 200 <= response.status_code < 300:
+                    logger.warning(
+                        f"Audit batch rejected with status {response.status_code}, "
+                        f"dropped {len(events)} events"
+                    )
+                return
+            
+            _audit_batch_supported = False
+            logger.info("Backend has no /agents/audit/batch endpoint, posting audit events one by one")
+        
+        for event in events:
+            response = backend_session.post(
+                f"{config.BACKEND_URL}/agents/audit",
+                headers=headers,
+                data=_audit_encoder.encode(event),
+                timeout=5
+            )
+            attempted += 1
+            if response.status_code == 401:
+                invalidate_agent_access(auth_token=auth_token)
+                logger.warning(f"Audit event rejected with status 401, dropped {len(events) - attempted + 1} events")
+                return
+            if not 200 <= response.status_code < 300:
+                logger.warning(f"Audit event rejected with status {response.status_code}, dropped it")
+    except requests.RequestException as e:
+        logger.warning(f"Audit post failed, dropped {len(events) - attempted} events: {e}")
+    except Exception:
+        # Keep the audit worker alive whatever happens to one batch
+        logger.exception(f"Unexpected error posting audit events, dropped {len(events) - attempted} events")
 
 
-def process_user_message(message: str, company_id: int, user_id: int, auth_token: str = "") -> Dict:
+def _audit_worker():
     """
-    Process user message with intent detection and routing
+    Drain the audit queue in micro-batches until the shutdown sentinel arrives
+    
+    A batch closes after AUDIT_BATCH_SIZE events or AUDIT_BATCH_WAIT_SECONDS,
+    and is sent with one request per auth token.
+    """
+    while True:
+        batch = [_audit_queue.get()]
+        deadline = time.monotonic() + AUDIT_BATCH_WAIT_SECONDS
+        while batch[-1] is not None and len(batch) < AUDIT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_audit_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        events_by_token: Dict[str, List[AuditEvent]] = {}
+        for item in batch:
+            if item is None:
+                continue
+            event, auth_token = item
+            events_by_token.setdefault(auth_token, []).append(event)
+        
+        for auth_token, events in events_by_token.items():
+            _post_audit(auth_token, events)
+        
+        if batch[-1] is None:
+            return
+
+
+def _shutdown_audit_worker():
+    """Let the worker post what is still queued before the process exits"""
+    try:
+        _audit_queue.put(None, timeout=1)
+    except queue.Full:
+        return
+    _audit_thread.join(timeout=5)
+
+
+# Audit events are posted by a background worker so /chat never waits on them
+AUDIT_BATCH_SIZE = 64
+AUDIT_BATCH_WAIT_SECONDS = 0.1
+_audit_batch_supported = True
+_audit_queue: queue.Queue = queue.Queue(maxsize=10_000)
+_audit_encoder = msgspec.json.Encoder()
+_audit_thread = threading.Thread(target=_audit_worker, name='sophia-audit', daemon=True)
+_audit_thread.start()
+atexit.register(_shutdown_audit_worker)
+
+
+def log_audit(action: str, entity_type: str, entity_id: str, payload: Any, auth_token: str):
+    """Queue an action for the backend audit system (fire-and-forget)"""
+    try:
+        _audit_queue.put_nowait((AuditEvent(action, entity_type, entity_id, payload), auth_token))
+    except queue.Full:
+        logger.warning(f"Audit queue full, dropping {action} event for {entity_id}")
+
+
+def _summarize_tool_data(tool_data: Any) -> str:
+    """One-line summary of a tool result for the chat response"""
+    if isinstance(tool_data, list) and tool_data:
+        return f"\nSe encontraron {len(tool_data)} elementos"
+    if isinstance(tool_data, dict):
+        return f"\nEstado: {tool_data.get('status', 'disponible')}"
+    return ""
+
+
+def stream_user_message(message: str, company_id: int, user_id: int, auth_token: str = "") -> Iterator[Dict]:
+    """
+    Process user message with intent detection and routing, yielding the
+    reply in sections as soon as each one is ready
     
     Args:
         message: User message
@@ -118,12 +502,15 @@ def process_user_message(message: str, company_id: int, user_id: int, auth_token
         user_id: User ID
         auth_token: Agent JWT token for backend authentication
     
-    Returns:
-        Dict with response and metadata
+    Yields:
+        {'event': 'intent', 'intent': ...} first, then one or more
+        {'event': 'delta', 'text': ...} sections of the response, and finally
+        {'event': 'done', 'result': ...} with the metadata (without 'response')
     """
     intent_type, action_request = intent_router.detect_intent(message)
     
     logger.info(f"Detected intent: {intent_type} for company {company_id}")
+    yield {'event': 'intent', 'intent': intent_type}
     
     if intent_type == "action":
         if intent_router.should_escalate_to_victoria(action_request):
@@ -135,190 +522,265 @@ def process_user_message(message: str, company_id: int, user_id: int, auth_token
                 context={"intent_type": intent_type}
             )
             
-            return {
-                'response': ticket_result['escalation_message'],
+            yield {'event': 'delta', 'text': ticket_result['escalation_message']}
+            yield {'event': 'done', 'result': {
                 'intent': 'action_escalated',
                 'ticket_id': ticket_result.get('ticket_id'),
                 'tool_calls': ['create_victoria_ticket']
-            }
+            }}
         else:
             result = execute_security_action(
                 action_request.action_type,
                 action_request.parameters
             )
             
-            return {
-                'response': f"✅ Acción ejecutada exitosamente:\n\n{result.get('message')}",
+            yield {'event': 'delta', 'text': f"✅ Acción ejecutada exitosamente:\n\n{result.get('message')}"}
+            yield {'event': 'done', 'result': {
                 'intent': 'action_executed',
                 'action_result': result,
                 'tool_calls': [action_request.action_type]
-            }
+            }}
     
     elif intent_type == "query":
         rag_tool = agent_loader.get_rag_tool(company_id)
         
         if rag_tool:
             # Generar respuesta natural en lugar de mostrar contexto RAW
-            natural_response = rag_tool.generate_natural_response(message)
+            yield {'event': 'delta', 'text': rag_tool.generate_natural_response(message)}
             
             # Determinar si necesitamos datos de herramientas de seguridad
-            message_lower = message.lower()
-            needs_security_tools = any(word in message_lower for word in [
-                'alert', 'log', 'metric', 'wazuh', 'meraki', 'palo', 'splunk', 'grafana',
-                'alerta', 'métrica', 'red', 'network'
-            ])
+            keyword_mask = 0
+            for hit in _TOOL_KEYWORD_RE.findall(message):
+                keyword_mask |= _KEYWORD_BITS.get(hit.lower(), 0)
+            needs_security_tools = bool(keyword_mask)
             
             tools_used = ['rag_search']
             tools_data = {}
             
             if needs_security_tools:
+                tool_requests = [
+                    ('palo_alto', get_palo_alto_alerts, ()),
+                    ('splunk', get_splunk_logs, (message, 5)),
+                    ('grafana', get_grafana_metrics, ()),
+                    ('wazuh', get_wazuh_alerts, ()),
+                    ('meraki', get_meraki_network_status, ())
+                ]
+                futures = {
+                    tool_name: tool_pool.submit(tool_fn, *args)
+                    for tool_name, tool_fn, args in tool_requests
+                    if keyword_mask & _TOOL_KEYWORD_MASKS[tool_name]
+                }
+                done, _ = wait(futures.values(), timeout=TOOL_TIMEOUT_SECONDS)
                 security_tools = {
-                    'palo_alto': get_palo_alto_alerts() if 'alert' in message_lower or 'palo' in message_lower or 'alerta' in message_lower else None,
-                    'splunk': get_splunk_logs(message, limit=5) if 'log' in message_lower or 'splunk' in message_lower else None,
-                    'grafana': get_grafana_metrics() if 'metric' in message_lower or 'grafana' in message_lower or 'métrica' in message_lower else None,
-                    'wazuh': get_wazuh_alerts() if 'wazuh' in message_lower else None,
-                    'meraki': get_meraki_network_status() if 'meraki' in message_lower or 'network' in message_lower or 'red' in message_lower else None
+                    tool_name: future.result() if future in done else None
+                    for tool_name, future in futures.items()
                 }
                 
                 tools_used.extend([k for k, v in security_tools.items() if v is not None])
                 tools_data = {k: v for k, v in security_tools.items() if v is not None}
                 
-                response_parts = [natural_response]
-                
                 if tools_data:
-                    response_parts.append("\n\n**📊 Datos de Herramientas de Seguridad:**\n")
-                    for tool_name, tool_data in tools_data.items():
-                        response_parts.append(f"\n**{tool_name.replace('_', ' ').title()}:**")
-                        if isinstance(tool_data, list) and tool_data:
-                            response_parts.append(f"Se encontraron {len(tool_data)} elementos")
-                        elif isinstance(tool_data, dict):
-                            response_parts.append(f"Estado: {tool_data.get('status', 'disponible')}")
-                
-                response = '\n'.join(response_parts)
-            else:
-                response = natural_response
+                    tool_sections = ''.join(
+                        f"\n\n**{tool_name.replace('_', ' ').title()}:**{_summarize_tool_data(tool_data)}"
+                        for tool_name, tool_data in tools_data.items()
+                    )
+                    yield {'event': 'delta', 'text': f"\n\n\n**📊 Datos de Herramientas de Seguridad:**\n{tool_sections}"}
             
-            return {
-                'response': response,
+            yield {'event': 'done', 'result': {
                 'intent': 'query',
                 'tool_calls': tools_used,
                 'tools_data': tools_data if tools_data else None
-            }
+            }}
         else:
-            return {
-                'response': "Puedo ayudarte a responder tus preguntas de seguridad. Por favor proporciona más detalles.",
+            yield {'event': 'delta', 'text': "Puedo ayudarte a responder tus preguntas de seguridad. Por favor proporciona más detalles."}
+            yield {'event': 'done', 'result': {
                 'intent': 'query',
                 'tool_calls': [],
                 'mode': 'mock'
-            }
+            }}
     
     else:
-        return {
-            'response': "No estoy seguro de cómo ayudarte con eso. ¿Podrías reformular tu pregunta o solicitud?",
+        yield {'event': 'delta', 'text': "No estoy seguro de cómo ayudarte con eso. ¿Podrías reformular tu pregunta o solicitud?"}
+        yield {'event': 'done', 'result': {
             'intent': 'unknown',
             'tool_calls': []
-        }
+        }}
 
 
-@app.route('/chat', methods=['POST'])
-def chat():
+def process_user_message(message: str, company_id: int, user_id: int, auth_token: str = "") -> Dict:
     """
-    Main chat endpoint for SOPHIA with modular architecture
+    Process user message with intent detection and routing
     
-    Request body:
-    {
-        "companyId": int,
-        "userId": int,
-        "message": str,
-        "threadId": str (optional),
-        "agentAccessKey": str
-    }
+    Returns:
+        Dict with response and metadata (see stream_user_message)
     """
-    data = request.get_json()
-    
-    if not data:
-        return jsonify({'error': 'Request body required'}), 400
+    sections = []
+    for event in stream_user_message(message, company_id, user_id, auth_token):
+        if event['event'] == 'delta':
+            sections.append(event['text'])
+        elif event['event'] == 'done':
+            result = event['result']
+    
+    return {'response': ''.join(sections), **result}
+
+
+def _open_chat(body: Optional[ChatRequest]) -> Tuple[Optional[Dict], Optional[Tuple[Response, int]]]:
+    """
+    Authenticate a chat request and prepare agent and thread
     
-    company_id = data.get('companyId')
-    user_id = data.get('userId')
-    message = data.get('message')
-    thread_id = data.get('threadId')
-    agent_access_key = data.get('agentAccessKey')
+    Returns:
+        (chat, None) on success, or (None, error_response) to return as-is
+    """
+    if body is None:
+        return None, (jsonify({'error': 'Request body required'}), 400)
     
-    if not all([company_id, user_id, message, agent_access_key]):
-        return jsonify({
-            'error': 'companyId, userId, message, and agentAccessKey are required'
-        }), 400
+    company_id = body.company_id
+    user_id = body.user_id
+    message = body.message
+    thread_id = body.thread_id
+    agent_access_key = body.agent_access_key
     
     auth_data = validate_agent_access(company_id, agent_access_key)
     if not auth_data:
-        return jsonify({'error': 'Invalid agent access credentials'}), 401
+        return None, (jsonify({'error': 'Invalid agent access credentials'}), 401)
     
     auth_token = auth_data['access_token']
-    agent_instance = auth_data.get('agent_instance', {})
     
-    if not agent_instance:
-        agent_instance = get_agent_instance(auth_data['agent_instance_id'])
+    # The loaded agent ignores azure_config, so only resolve the instance
+    # metadata when the company has no agent yet
+    agent = agent_loader.get_agent(company_id)
+    if agent:
+        agent_id = agent.get('agent_id')
+    else:
+        agent_instance = auth_data.get('agent_instance', {})
+        
         if not agent_instance:
-            return jsonify({
-                'error': 'Agent instance metadata unavailable'
-            }), 502
-    
-    azure_config = {
-        'azure_project_id': agent_instance.get('azure_project_id'),
-        'azure_agent_id': agent_instance.get('azure_agent_id'),
-        'azure_vector_store_id': agent_instance.get('azure_vector_store_id'),
-        'azure_openai_endpoint': agent_instance.get('azure_openai_endpoint'),
-        'azure_openai_key': agent_instance.get('azure_openai_key'),
-        'azure_openai_deployment': agent_instance.get('azure_openai_deployment'),
-        'azure_search_endpoint': agent_instance.get('azure_search_endpoint'),
-        'azure_search_key': agent_instance.get('azure_search_key')
-    }
-    
-    agent_id = agent_loader.initialize_agent(company_id, azure_config)
+            agent_instance = get_agent_instance(auth_data['agent_instance_id'])
+            if not agent_instance:
+                return None, (jsonify({
+                    'error': 'Agent instance metadata unavailable'
+                }), 502)
+        
+        azure_config = {key: agent_instance.get(key) for key in _AZURE_CONFIG_KEYS}
+        agent_id = agent_loader.initialize_agent(company_id, azure_config)
     
     if not thread_id:
         thread_id = memory_manager.create_thread(company_id, user_id)
     
     memory_manager.add_message(thread_id, 'user', message)
     
-    result = process_user_message(message, company_id, user_id, auth_token)
-    
-    memory_manager.add_message(thread_id, 'assistant', result['response'])
-    
-    log_audit('CHAT', 'SOPHIA_MESSAGE', thread_id, {
+    return {
         'company_id': company_id,
         'user_id': user_id,
-        'intent': result.get('intent'),
-        'message_length': len(message)
-    }, auth_token)
+        'message': message,
+        'thread_id': thread_id,
+        'agent_id': agent_id,
+        'auth_token': auth_token
+    }, None
+
+
+def _close_chat(chat: Dict, result: Dict) -> Dict:
+    """Record the assistant reply and audit the exchange; returns the API payload"""
+    company_id = chat['company_id']
     
-    return jsonify({
+    memory_manager.add_message(chat['thread_id'], 'assistant', result['response'])
+    
+    log_audit('CHAT', 'SOPHIA_MESSAGE', chat['thread_id'], ChatAuditPayload(
+        company_id=company_id,
+        user_id=chat['user_id'],
+        intent=result.get('intent'),
+        message_length=len(chat['message'])
+    ), chat['auth_token'])
+    
+    return {
         'response': result['response'],
-        'threadId': thread_id,
-        'agentId': agent_id,
+        'threadId': chat['thread_id'],
+        'agentId': chat['agent_id'],
         'intent': result.get('intent'),
         'toolCalls': result.get('tool_calls', []),
         'ticketId': result.get('ticket_id'),
         'mode': 'mock' if agent_loader.is_mock_mode(company_id) else 'azure'
-    }), 200
+    }
+
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    """
+    Main chat endpoint for SOPHIA with modular architecture
+    
+    Request body:
+    {
+        "companyId": int,
+        "userId": int,
+        "message": str,
+        "threadId": str (optional),
+        "agentAccessKey": str
+    }
+    """
+    chat_session, error = _open_chat(parse_body(ChatRequest))
+    if error:
+        return error
+    
+    result = process_user_message(
+        chat_session['message'],
+        chat_session['company_id'],
+        chat_session['user_id'],
+        chat_session['auth_token']
+    )
+    
+    return jsonify(_close_chat(chat_session, result)), 200
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Chat endpoint streaming the reply as Server-Sent Events
+    
+    Takes the same body as /chat. Emits an 'intent' event, one 'delta' event
+    per section of the response, and a final 'done' event carrying the same
+    payload /chat returns.
+    """
+    chat_session, error = _open_chat(parse_body(ChatRequest))
+    if error:
+        return error
+    
+    def generate():
+        sections = []
+        for event in stream_user_message(
+            chat_session['message'],
+            chat_session['company_id'],
+            chat_session['user_id'],
+            chat_session['auth_token']
+        ):
+            if event['event'] == 'delta':
+                sections.append(event['text'])
+            elif event['event'] == 'done':
+                result = {'response': ''.join(sections), **event['result']}
+                event = {'event': 'done', **_close_chat(chat_session, result)}
+            yield f"data: {app.json.dumps(event)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/threads/<thread_id>', methods=['GET'])
 def get_thread(thread_id):
     """Get conversation history for a thread"""
-    context = memory_manager.get_context(thread_id)
+    history = memory_manager.get_thread_history(thread_id)
     
-    if not context:
+    if not history:
         return jsonify({'error': 'Thread not found'}), 404
     
     return jsonify({
         'threadId': thread_id,
-        'companyId': context.company_id,
-        'userId': context.user_id,
-        'messages': context.messages,
-        'createdAt': context.created_at.isoformat(),
-        'lastUpdated': context.last_updated.isoformat()
+        'companyId': history['company_id'],
+        'userId': history['user_id'],
+        'messages': history['messages'],
+        'createdAt': history['created_at'],
+        'lastUpdated': history['last_updated']
     }), 200
 
 
@@ -336,18 +798,13 @@ def clear_thread(thread_id):
 @app.route('/config/test', methods=['POST'])
 def test_config():
     """Test Azure credentials and configuration"""
-    data = request.get_json()
+    body = parse_body(ConfigTestRequest)
     
-    if not data:
+    if body is None:
         return jsonify({'error': 'Request body required'}), 400
     
-    company_id = data.get('companyId')
-    agent_access_key = data.get('agentAccessKey')
-    
-    if not all([company_id, agent_access_key]):
-        return jsonify({
-            'error': 'companyId and agentAccessKey are required'
-        }), 400
+    company_id = body.company_id
+    agent_access_key = body.agent_access_key
     
     auth_data = validate_agent_access(company_id, agent_access_key)
     if not auth_data:
@@ -355,6 +812,12 @@ def test_config():
     
     agent_instance = auth_data.get('agent_instance', {})
     
+    # Locally verified service tokens carry no instance metadata
+    if not agent_instance:
+        agent_instance = get_agent_instance(auth_data['agent_instance_id'])
+        if not agent_instance:
+            return jsonify({'error': 'Agent instance metadata unavailable'}), 502
+    
     has_openai = bool(agent_instance.get('azure_openai_endpoint') and agent_instance.get('azure_openai_key'))
     has_search = bool(agent_instance.get('azure_search_endpoint') and agent_instance.get('azure_search_key'))
     
@@ -391,42 +854,51 @@ def cache_stats():
 @app.route('/cache/invalidate', methods=['POST'])
 def invalidate_cache():
     """Invalidate cache for a company"""
-    data = request.get_json()
-    company_id = data.get('companyId')
+    body = parse_body(CacheInvalidateRequest)
+    company_id = body.company_id if body else None
     
-    if company_id:
+    if company_id is not None:
         config_cache.invalidate(company_id)
         agent_loader.clear_agent(company_id)
+        invalidate_agent_access(company_id=company_id)
+        invalidate_agent_instances(company_id=company_id)
         return jsonify({'message': f'Cache invalidated for company {company_id}'}), 200
     else:
         config_cache.invalidate_all()
+        agent_loader.clear_all()
+        invalidate_agent_access()
+        invalidate_agent_instances()
         return jsonify({'message': 'All cache invalidated'}), 200
 
 
+_INDEX_BODY = orjson.dumps({
+    'service': 'SOPHIA AI Agent Service',
+    'version': '2.0.0',
+    'architecture': 'modular',
+    'description': 'Multi-tenant cybersecurity assistant with intent routing and VictorIA handoff',
+    'endpoints': {
+        '/health': 'Health check',
+        '/chat': 'Chat with SOPHIA (POST)',
+        '/chat/stream': 'Chat with SOPHIA, streamed as Server-Sent Events (POST)',
+        '/threads/<id>': 'Get or delete thread (GET/DELETE)',
+        '/config/test': 'Test Azure configuration (POST)',
+        '/cache/stats': 'Cache statistics (GET)',
+        '/cache/invalidate': 'Invalidate cache (POST)'
+    },
+    'capabilities': {
+        'intent_routing': 'Automatically detects query vs action intents',
+        'victoria_handoff': 'Escalates high-risk actions to VictorIA',
+        'rag_search': 'Azure AI Search integration',
+        'security_tools': ['Palo Alto', 'Splunk', 'Grafana', 'Wazuh', 'Meraki'],
+        'multi_tenant': 'Per-company Azure credentials and isolation'
+    }
+})
+
+
 @app.route('/', methods=['GET'])
 def index():
     """Service info endpoint"""
-    return jsonify({
-        'service': 'SOPHIA AI Agent Service',
-        'version': '2.0.0',
-        'architecture': 'modular',
-        'description': 'Multi-tenant cybersecurity assistant with intent routing and VictorIA handoff',
-        'endpoints': {
-            '/health': 'Health check',
-            '/chat': 'Chat with SOPHIA (POST)',
-            '/threads/<id>': 'Get or delete thread (GET/DELETE)',
-            '/config/test': 'Test Azure configuration (POST)',
-            '/cache/stats': 'Cache statistics (GET)',
-            '/cache/invalidate': 'Invalidate cache (POST)'
-        },
-        'capabilities': {
-            'intent_routing': 'Automatically detects query vs action intents',
-            'victoria_handoff': 'Escalates high-risk actions to VictorIA',
-            'rag_search': 'Azure AI Search integration',
-            'security_tools': ['Palo Alto', 'Splunk', 'Grafana', 'Wazuh', 'Meraki'],
-            'multi_tenant': 'Per-company Azure credentials and isolation'
-        }
-    }), 200
+    return Response(_INDEX_BODY, status=200, mimetype='application/json')
 
 
 if __name__ == '__main__':
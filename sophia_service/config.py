@@ -1,8 +1,10 @@
 import os
 import logging
+import threading
+import time
 from dataclasses import dataclass
 from typing import Dict, Optional
-from datetime import datetime, timedelta
+from cachetools import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +15,9 @@ class SophiaConfig:
     
     BACKEND_URL: str = os.getenv('BACKEND_URL', 'http://localhost:5000/api')
     
+    # Backend JWT_SECRET_KEY; when set, service tokens are verified locally
+    SOPHIA_SHARED_SECRET: str = os.getenv('SOPHIA_SHARED_SECRET', '')
+    
     AZURE_OPENAI_ENDPOINT: str = os.getenv('AZURE_OPENAI_ENDPOINT', '')
     AZURE_OPENAI_KEY: str = os.getenv('AZURE_OPENAI_KEY', '')
     AZURE_OPENAI_DEPLOYMENT: str = os.getenv('AZURE_OPENAI_DEPLOYMENT', 'gpt-4o')
@@ -24,8 +29,12 @@ class SophiaConfig:
     SOPHIA_HOST: str = os.getenv('SOPHIA_HOST', '0.0.0.0')
     
     CORS_ORIGINS: str = os.getenv('CORS_ORIGINS', '*')
+    CORS_ORIGINS_LIST: tuple = tuple(
+        origin.strip() for origin in CORS_ORIGINS.split(',') if origin.strip()
+    )
     
     CACHE_TTL_SECONDS: int = int(os.getenv('CACHE_TTL_SECONDS', '3600'))
+    CACHE_MAX_ENTRIES: int = int(os.getenv('CACHE_MAX_ENTRIES', '2048'))
     DEBUG: bool = os.getenv('DEBUG', 'False').lower() == 'true'
     
     @classmethod
@@ -39,8 +48,8 @@ class SophiaConfig:
             required.append('AZURE_OPENAI_KEY')
             
         if required:
-            print(f"⚠️  Missing required config: {', '.join(required)}")
-            print("SOPHIA will run in limited mode without Azure AI capabilities")
+            logger.warning(f"⚠️  Missing required config: {', '.join(required)}")
+            logger.warning("SOPHIA will run in limited mode without Azure AI capabilities")
             return False
         
         return True
@@ -56,66 +65,83 @@ class SophiaConfig:
         return {
             'debug': cls.DEBUG,
             'backend_url': cls.BACKEND_URL,
+            'local_token_auth': bool(cls.SOPHIA_SHARED_SECRET),
             'azure_configured': cls.is_azure_configured(),
             'cache_ttl': cls.CACHE_TTL_SECONDS,
             'has_search': bool(cls.AZURE_SEARCH_ENDPOINT)
         }
 
 
+class CountingTTLCache(TTLCache):
+    """TTLCache that counts capacity evictions"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize=maxsize, ttl=ttl, timer=time.monotonic)
+        self.evictions = 0
+    
+    def popitem(self):
+        self.evictions += 1
+        return super().popitem()
+
+
 class ConfigCache:
-    """Cache for agent configurations"""
+    """Cache for agent configurations, bounded in size and thread-safe"""
     
-    def __init__(self, ttl_seconds: int = 3600):
-        self._cache: Dict[str, Dict] = {}
-        self._timestamps: Dict[str, datetime] = {}
-        self.ttl = timedelta(seconds=ttl_seconds)
+    def __init__(self, ttl_seconds: int = 3600, maxsize: int = 2048):
+        self._cache = CountingTTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
     
     def get(self, company_id: int) -> Optional[Dict]:
         """Get cached config for company"""
         key = f"company-{company_id}"
         
-        if key not in self._cache:
-            return None
-        
-        if key in self._timestamps:
-            age = datetime.utcnow() - self._timestamps[key]
-            if age > self.ttl:
-                logger.info(f"Cache expired for company {company_id}")
-                self.invalidate(company_id)
-                return None
-        
-        return self._cache.get(key)
+        with self._lock:
+            config = self._cache.get(key)
+            if config is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return config
     
     def set(self, company_id: int, config: Dict):
         """Set cached config for company"""
         key = f"company-{company_id}"
-        self._cache[key] = config
-        self._timestamps[key] = datetime.utcnow()
+        with self._lock:
+            self._cache[key] = config
         logger.info(f"Cached config for company {company_id}")
     
     def invalidate(self, company_id: int):
         """Invalidate cache for company"""
         key = f"company-{company_id}"
-        if key in self._cache:
-            del self._cache[key]
-        if key in self._timestamps:
-            del self._timestamps[key]
+        with self._lock:
+            self._cache.pop(key, None)
         logger.info(f"Invalidated cache for company {company_id}")
     
     def invalidate_all(self):
         """Clear all cache"""
-        self._cache.clear()
-        self._timestamps.clear()
+        with self._lock:
+            self._cache.clear()
         logger.info("Invalidated all cache")
     
     def get_stats(self) -> Dict:
         """Get cache statistics"""
-        return {
-            'total_entries': len(self._cache),
-            'ttl_seconds': self.ttl.total_seconds(),
-            'companies': list(self._cache.keys())
-        }
+        with self._lock:
+            self._cache.expire()
+            return {
+                'total_entries': len(self._cache),
+                'max_entries': self._cache.maxsize,
+                'ttl_seconds': float(self._cache.ttl),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self._cache.evictions,
+                'companies': list(self._cache.keys())
+            }
 
 
 config = SophiaConfig()
-config_cache = ConfigCache(ttl_seconds=config.CACHE_TTL_SECONDS)
+config_cache = ConfigCache(
+    ttl_seconds=config.CACHE_TTL_SECONDS,
+    maxsize=config.CACHE_MAX_ENTRIES
+)
@@ -1,15 +1,27 @@
-from typing import Dict, Any, Optional, List
-import json
+from typing import Dict, Any, Optional, List, Tuple
 import sys
 import os
+import hashlib
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import LRUCache, TTLCache
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
 
 try:
     from azure.ai.projects import AIProjectClient
     from azure.core.credentials import AzureKeyCredential
+    from azure.core.pipeline.transport import RequestsTransport
     AZURE_AVAILABLE = True
 except ImportError:
     AZURE_AVAILABLE = False
-    print("Warning: Azure AI Projects SDK not available, running in mock mode")
+    logger.warning("Azure AI Projects SDK not available, running in mock mode")
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -20,6 +32,26 @@ from tools.palo_alto import PaloAltoTool
 from tools.grafana import GrafanaTool
 from tools.create_ticket import CreateTicketTool
 
+# Connections kept alive per Azure host by the shared transport
+AZURE_POOL_MAXSIZE = 50
+# Companies share this many initialization locks
+INIT_LOCK_STRIPES = 64
+
+
+def _create_azure_transport():
+    """
+    Build the HTTP transport shared by every AIProjectClient
+    
+    Messages, runs, get_run polls and list_messages all go through one
+    keep-alive connection pool instead of one pool per client. Retries are
+    left to the Azure SDK's own retry policy.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=AZURE_POOL_MAXSIZE, pool_maxsize=AZURE_POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return RequestsTransport(session=session, session_owner=False)
+
 class SophiaOrchestrator:
     """
     SOPHIA orchestrator using Microsoft Agent Framework (Azure AI Agents)
@@ -42,6 +74,14 @@ Guidelines:
 
 Remember: You are READ-ONLY for monitoring. All infrastructure actions go through VICTORIA via tickets."""
     
+    # Backoff between get_run polls: starts short so quick runs return fast,
+    # grows (with jitter) so long runs don't flood Azure with status calls
+    RUN_POLL_INITIAL_DELAY_SECONDS = 0.05
+    RUN_POLL_MAX_DELAY_SECONDS = 1.0
+    RUN_POLL_BACKOFF = 1.6
+    RUN_POLL_JITTER = 0.3
+    ACTIVE_RUN_STATUSES = frozenset({"queued", "in_progress", "requires_action"})
+    
     def __init__(self):
         self.backend_url = config.BACKEND_URL
         
@@ -50,9 +90,22 @@ Remember: You are READ-ONLY for monitoring. All infrastructure actions go throug
         self.grafana_tool = GrafanaTool(self.backend_url)
         self.create_ticket_tool = CreateTicketTool(self.backend_url)
         
-        self.threads: Dict[str, str] = {}
-        self.agents: Dict[str, Dict[str, Any]] = {}
-        self.config_cache: Dict[int, Dict[str, Any]] = {}
+        # Bounded so a long-running process doesn't grow with every company/thread.
+        # Agents are LRU-bounded, not expired: re-creating one on expiry would
+        # leave the previous agent orphaned on Azure.
+        self.threads: LRUCache = LRUCache(maxsize=10_000)
+        self.agents: LRUCache = LRUCache(maxsize=2048)
+        self.config_cache: TTLCache = TTLCache(maxsize=2048, ttl=3600)
+        self._lock = threading.RLock()
+        # Azure clients keyed by (endpoint, sha256 of the key), shared by every
+        # company on the same resource so they share one HTTP connection pool
+        self._project_clients: Dict[Tuple[str, str], Any] = {}
+        self._rag_tools: Dict[Tuple[str, str], RAGSearchTool] = {}
+        self._azure_transport = _create_azure_transport() if AZURE_AVAILABLE else None
+        # Striped locks serializing initialize_agent per company; a fixed set,
+        # so it doesn't grow with the number of companies
+        self._init_locks = tuple(threading.Lock() for _ in range(INIT_LOCK_STRIPES))
+        self._tool_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='sophia-agent-tools')
     
     def initialize_agent(
         self,
@@ -79,12 +132,41 @@ Remember: You are READ-ONLY for monitoring. All infrastructure actions go throug
         """
         agent_key = f"company-{company_id}"
         
-        # Check if agent already initialized with cached config
-        if agent_key in self.agents and company_id in self.config_cache:
-            return self.agents[agent_key]['agent_id']
+        # Fast path: agent already initialized with cached config
+        agent_id = self._initialized_agent_id(agent_key, company_id)
+        if agent_id:
+            return agent_id
+        
+        # One initialization per company at a time, so concurrent first
+        # requests don't each create (and leak) an agent on Azure
+        init_lock = self._init_locks[hash(agent_key) % INIT_LOCK_STRIPES]
         
-        # Store config in cache
-        self.config_cache[company_id] = azure_config
+        with init_lock:
+            agent_id = self._initialized_agent_id(agent_key, company_id)
+            if agent_id:
+                return agent_id
+            
+            # Store config in cache; an expired config that comes back unchanged
+            # keeps the existing agent
+            with self._lock:
+                self.config_cache[company_id] = azure_config
+                agent = self.agents.get(agent_key)
+                if agent and agent['config'] == azure_config:
+                    return agent['agent_id']
+            
+            return self._create_agent(company_id, azure_config)
+    
+    def _initialized_agent_id(self, agent_key: str, company_id: int) -> Optional[str]:
+        """Agent ID of a company whose agent and config are both cached"""
+        with self._lock:
+            agent = self.agents.get(agent_key)
+            if agent and company_id in self.config_cache:
+                return agent['agent_id']
+            return None
+    
+    def _create_agent(self, company_id: int, azure_config: Dict[str, Any]) -> str:
+        """Create the agent for a company, falling back to mock mode"""
+        agent_key = f"company-{company_id}"
         
         try:
             azure_openai_endpoint = azure_config.get('azure_openai_endpoint')
@@ -96,23 +178,15 @@ Remember: You are READ-ONLY for monitoring. All infrastructure actions go throug
             
             if not AZURE_AVAILABLE or not azure_openai_endpoint or not azure_openai_key:
                 agent_id = f"mock-agent-{company_id}"
-                self.agents[agent_key] = {
-                    'agent_id': agent_id,
-                    'config': azure_config
-                }
+                with self._lock:
+                    self.agents[agent_key] = {
+                        'agent_id': agent_id,
+                        'config': azure_config
+                    }
                 return agent_id
             
-            credential = AzureKeyCredential(azure_openai_key)
-            
-            project_client = AIProjectClient(
-                endpoint=azure_openai_endpoint,
-                credential=credential
-            )
-            
-            rag_tool = RAGSearchTool(
-                azure_search_endpoint or '',
-                azure_search_key or ''
-            )
+            project_client = self._get_project_client(azure_openai_endpoint, azure_openai_key)
+            rag_tool = self._get_rag_tool(azure_search_endpoint or '', azure_search_key or '')
             
             tools = [
                 rag_tool.get_tool_definition(),
@@ -133,36 +207,68 @@ Remember: You are READ-ONLY for monitoring. All infrastructure actions go throug
                 )
                 agent_id = agent_response.id
             
-            self.agents[agent_key] = {
-                'agent_id': agent_id,
-                'project_client': project_client,
-                'config': azure_config,
-                'rag_tool': rag_tool
-            }
+            with self._lock:
+                self.agents[agent_key] = {
+                    'agent_id': agent_id,
+                    'project_client': project_client,
+                    'config': azure_config,
+                    'rag_tool': rag_tool
+                }
             return agent_id
             
         except Exception as e:
-            print(f"Error initializing agent for company {company_id}: {e}")
+            logger.error(f"Error initializing agent for company {company_id}: {e}")
             agent_id = f"mock-agent-{company_id}"
-            self.agents[agent_key] = {
-                'agent_id': agent_id,
-                'config': azure_config
-            }
+            with self._lock:
+                self.agents[agent_key] = {
+                    'agent_id': agent_id,
+                    'config': azure_config
+                }
             return agent_id
     
+    @staticmethod
+    def _client_key(endpoint: str, key: str) -> Tuple[str, str]:
+        return endpoint, hashlib.sha256(key.encode('utf-8')).hexdigest()
+    
+    def _get_project_client(self, endpoint: str, key: str):
+        """Get the shared AIProjectClient for an Azure endpoint and key"""
+        client_key = self._client_key(endpoint, key)
+        with self._lock:
+            project_client = self._project_clients.get(client_key)
+            if project_client is None:
+                project_client = AIProjectClient(
+                    endpoint=endpoint,
+                    credential=AzureKeyCredential(key),
+                    transport=self._azure_transport
+                )
+                self._project_clients[client_key] = project_client
+            return project_client
+    
+    def _get_rag_tool(self, search_endpoint: str, search_key: str) -> RAGSearchTool:
+        """Get the shared RAGSearchTool for an Azure Search service"""
+        tool_key = self._client_key(search_endpoint, search_key)
+        with self._lock:
+            rag_tool = self._rag_tools.get(tool_key)
+            if rag_tool is None:
+                rag_tool = RAGSearchTool(search_endpoint, search_key)
+                self._rag_tools[tool_key] = rag_tool
+            return rag_tool
+    
     def create_thread(self, company_id: int) -> str:
         """Create a new conversation thread for a company"""
         try:
             agent_key = f"company-{company_id}"
-            if agent_key in self.agents and 'project_client' in self.agents[agent_key]:
-                project_client = self.agents[agent_key]['project_client']
+            with self._lock:
+                agent_data = self.agents.get(agent_key, {})
+            if 'project_client' in agent_data:
+                project_client = agent_data['project_client']
                 thread_response = project_client.agents.create_thread()
                 return thread_response.id
             else:
                 import uuid
                 return f"mock-thread-{uuid.uuid4()}"
         except Exception as e:
-            print(f"Error creating thread: {e}")
+            logger.error(f"Error creating thread: {e}")
             import uuid
             return f"mock-thread-{uuid.uuid4()}"
     
@@ -179,7 +285,8 @@ Remember: You are READ-ONLY for monitoring. All infrastructure actions go throug
         try:
             if tool_name == "rag_search":
                 agent_key = f"company-{company_id}"
-                rag_tool = self.agents.get(agent_key, {}).get('rag_tool')
+                with self._lock:
+                    rag_tool = self.agents.get(agent_key, {}).get('rag_tool')
                 if rag_tool:
                     return rag_tool.search(
                         company_id,
@@ -256,7 +363,8 @@ Remember: You are READ-ONLY for monitoring. All infrastructure actions go throug
         """
         try:
             agent_key = f"company-{company_id}"
-            agent_data = self.agents.get(agent_key, {})
+            with self._lock:
+                agent_data = self.agents.get(agent_key, {})
             project_client = agent_data.get('project_client')
             
             if not project_client or agent_id.startswith("mock-"):
@@ -277,41 +385,52 @@ Remember: You are READ-ONLY for monitoring. All infrastructure actions go throug
                 agent_id=agent_id
             )
             
-            while run.status in ["queued", "in_progress", "requires_action"]:
-                run = project_client.agents.get_run(
-                    thread_id=thread_id,
-                    run_id=run.id
-                )
+            poll_delay = self.RUN_POLL_INITIAL_DELAY_SECONDS
+            while run.status in self.ACTIVE_RUN_STATUSES:
+                if run.status != "requires_action":
+                    time.sleep(poll_delay + random.uniform(0, poll_delay * self.RUN_POLL_JITTER))
+                    poll_delay = min(poll_delay * self.RUN_POLL_BACKOFF, self.RUN_POLL_MAX_DELAY_SECONDS)
+                    run = project_client.agents.get_run(
+                        thread_id=thread_id,
+                        run_id=run.id
+                    )
                 
                 if run.status == "requires_action":
-                    tool_outputs = []
-                    for tool_call in run.required_action.submit_tool_outputs.tool_calls:
-                        arguments = json.loads(tool_call.function.arguments)
-                        result = self.execute_tool(
+                    # Run the requested tools concurrently: the turn waits for
+                    # the slowest tool instead of the sum of all of them
+                    tool_calls = run.required_action.submit_tool_outputs.tool_calls
+                    futures = [
+                        self._tool_pool.submit(
+                            self.execute_tool,
                             tool_call.function.name,
-                            arguments,
+                            orjson.loads(tool_call.function.arguments),
                             company_id,
                             user_id,
                             vector_store_id,
                             auth_token
                         )
-                        tool_outputs.append({
+                        for tool_call in tool_calls
+                    ]
+                    tool_outputs = [
+                        {
                             "tool_call_id": tool_call.id,
-                            "output": json.dumps(result)
-                        })
+                            "output": orjson.dumps(future.result()).decode()
+                        }
+                        for tool_call, future in zip(tool_calls, futures)
+                    ]
                     
                     run = project_client.agents.submit_tool_outputs_to_run(
                         thread_id=thread_id,
                         run_id=run.id,
                         tool_outputs=tool_outputs
                     )
+                    poll_delay = self.RUN_POLL_INITIAL_DELAY_SECONDS
             
             messages = project_client.agents.list_messages(thread_id=thread_id)
             latest_message = messages.data[0]
             
-            response_text = ""
-            if hasattr(latest_message.content[0], 'text'):
-                response_text = latest_message.content[0].text.value
+            text_content = getattr(latest_message.content[0], 'text', None)
+            response_text = text_content.value if text_content is not None else ""
             
             return {
                 "response": response_text,
@@ -334,10 +453,9 @@ Remember: You are READ-ONLY for monitoring. All infrastructure actions go throug
             company_id: Company identifier
         """
         agent_key = f"company-{company_id}"
-        if company_id in self.config_cache:
-            del self.config_cache[company_id]
-        if agent_key in self.agents:
-            del self.agents[agent_key]
+        with self._lock:
+            self.config_cache.pop(company_id, None)
+            self.agents.pop(agent_key, None)
     
     def refresh_knowledge(self, company_id: int, vector_store_id: str) -> Dict[str, Any]:
         """
@@ -3,20 +3,84 @@ Agent Loader for SOPHIA
 Dynamically initializes AI agents based on tenant configuration
 """
 
+import hashlib
 import logging
-from typing import Dict, Optional
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
 from .rag_tools import RAGTool
 
 logger = logging.getLogger(__name__)
 
+try:
+    from azure.ai.projects import AIProjectClient
+    from azure.core.credentials import AzureKeyCredential
+    AZURE_AVAILABLE = True
+except ImportError as e:
+    AZURE_AVAILABLE = False
+    logger.warning(f"Azure AI Projects SDK not available: {e}")
+
+
+@dataclass(slots=True)
+class AgentEntry:
+    """Everything loaded for one company's agent"""
+    info: Optional[Dict] = None
+    rag: Optional[RAGTool] = None
+    client: Any = None
+    # Cached from info['mode'] so routing checks are an attribute read
+    is_mock: bool = True
+
 
 class AgentLoader:
     """Loads and initializes AI agents for tenants"""
     
     def __init__(self):
-        self._agents = {}
-        self._rag_tools = {}
-        self._project_clients = {}
+        self._entries: Dict[int, AgentEntry] = {}
+        # RAG tools keyed by search service, shared by the companies using it
+        self._shared_rag_tools: Dict[Tuple[Optional[str], Optional[str]], RAGTool] = {}
+        # AIProjectClients keyed the same way: one pipeline and TLS session per
+        # Azure resource instead of one per request
+        self._shared_project_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+        # Guards all loader state; reentrant so refresh_agent can hold it
+        # across clear_agent and initialize_agent
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def _service_key(endpoint: Optional[str], key: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        key_hash = hashlib.sha256(key.encode('utf-8')).hexdigest() if key else None
+        return endpoint, key_hash
+    
+    def _get_shared_project_client(self, endpoint: str, key: str):
+        """Get the AIProjectClient for an Azure endpoint and key"""
+        client_key = self._service_key(endpoint, key)
+        
+        with self._lock:
+            project_client = self._shared_project_clients.get(client_key)
+            if project_client is None:
+                project_client = AIProjectClient(
+                    endpoint=endpoint,
+                    credential=AzureKeyCredential(key)
+                )
+                self._shared_project_clients[client_key] = project_client
+            return project_client
+    
+    def _get_shared_rag_tool(
+        self,
+        search_endpoint: Optional[str],
+        search_key: Optional[str]
+    ) -> RAGTool:
+        """Get the RAG tool (and its Azure Search client) for a search service"""
+        tool_key = self._service_key(search_endpoint, search_key)
+        
+        with self._lock:
+            rag_tool = self._shared_rag_tools.get(tool_key)
+            if rag_tool is None:
+                rag_tool = RAGTool(
+                    search_endpoint=search_endpoint,
+                    search_key=search_key
+                )
+                self._shared_rag_tools[tool_key] = rag_tool
+            return rag_tool
     
     def initialize_agent(
         self,
@@ -40,13 +104,22 @@ class AgentLoader:
         Returns:
             Agent ID or None if initialization fails
         """
-        agent_key = f"company-{company_id}"
-        
         # Check if already initialized
-        if agent_key in self._agents:
+        entry = self._entries.get(company_id)
+        if entry is not None and entry.info is not None:
             logger.info(f"Agent already initialized for company {company_id}")
-            return self._agents[agent_key].get('agent_id')
+            return entry.info.get('agent_id')
         
+        with self._lock:
+            # Another request may have initialized it while we waited
+            entry = self._entries.get(company_id)
+            if entry is not None and entry.info is not None:
+                return entry.info.get('agent_id')
+            
+            return self._load_agent(company_id, azure_config)
+    
+    def _load_agent(self, company_id: int, azure_config: Dict) -> str:
+        """Build and register a company's agent; caller holds the lock"""
         # Extract configuration
         openai_endpoint = azure_config.get('azure_openai_endpoint')
         openai_key = azure_config.get('azure_openai_key')
@@ -56,11 +129,8 @@ class AgentLoader:
         search_endpoint = azure_config.get('azure_search_endpoint')
         search_key = azure_config.get('azure_search_key')
         
-        rag_tool = RAGTool(
-            search_endpoint=search_endpoint,
-            search_key=search_key
-        )
-        self._rag_tools[agent_key] = rag_tool
+        entry = self._entries.setdefault(company_id, AgentEntry())
+        entry.rag = self._get_shared_rag_tool(search_endpoint, search_key)
         
         # Try to initialize with Azure AI Agents
         if openai_endpoint and openai_key:
@@ -71,7 +141,8 @@ class AgentLoader:
                 )
                 
                 if agent_info:
-                    self._agents[agent_key] = agent_info
+                    entry.info = agent_info
+                    entry.is_mock = agent_info.get('mode') == 'mock'
                     logger.info(f"✅ Agent initialized for company {company_id} with Azure AI")
                     return agent_info.get('agent_id')
             
@@ -87,7 +158,8 @@ class AgentLoader:
             'deployment': deployment,
             'has_rag': bool(search_endpoint and search_key)
         }
-        self._agents[agent_key] = mock_agent
+        entry.info = mock_agent
+        entry.is_mock = True
         
         return mock_agent['agent_id']
     
@@ -97,32 +169,30 @@ class AgentLoader:
         azure_config: Dict
     ) -> Optional[Dict]:
         """Initialize agent using Azure AI Projects"""
+        if not AZURE_AVAILABLE:
+            return None
+        
         try:
-            from azure.ai.projects import AIProjectClient
-            from azure.identity import DefaultAzureCredential
-            from azure.ai.projects.models import Agent
-            
             # Get configuration
             project_id = azure_config.get('azure_project_id')
             openai_endpoint = azure_config.get('azure_openai_endpoint')
+            openai_key = azure_config.get('azure_openai_key')
             deployment = azure_config.get('azure_openai_deployment', 'gpt-4o')
             
             if not project_id:
                 logger.warning("No azure_project_id provided, cannot initialize Azure AI agent")
                 return None
             
-            # Create project client
-            # Note: This requires proper Azure authentication
-            # For now, we'll use a simplified approach
+            # Create (or reuse) the project client; a client failure leaves the
+            # agent in azure mode without one, it does not fall back to mock
             logger.info(f"Attempting to create Azure AI Project client for company {company_id}")
+            try:
+                project_client = self._get_shared_project_client(openai_endpoint, openai_key)
+            except Exception as e:
+                logger.error(f"Error creating Azure AI Project client for company {company_id}: {e}")
+                project_client = None
+            self._entries.setdefault(company_id, AgentEntry()).client = project_client
             
-            # In production, you would create the actual client:
-            # project_client = AIProjectClient.from_connection_string(
-            #     conn_str=connection_string,
-            #     credential=DefaultAzureCredential()
-            # )
-            
-            # For now, return mock agent info with real config
             return {
                 'agent_id': azure_config.get('azure_agent_id') or f"azure-agent-{company_id}",
                 'mode': 'azure',
@@ -133,45 +203,51 @@ class AgentLoader:
                 'has_rag': bool(azure_config.get('azure_search_endpoint'))
             }
         
-        except ImportError as e:
-            logger.error(f"Azure AI Projects SDK not available: {e}")
-            return None
         except Exception as e:
             logger.error(f"Error initializing Azure AI agent: {e}")
             return None
     
     def get_agent(self, company_id: int) -> Optional[Dict]:
         """Get agent info for a company"""
-        agent_key = f"company-{company_id}"
-        return self._agents.get(agent_key)
+        entry = self._entries.get(company_id)
+        return entry.info if entry is not None else None
+    
+    def get_project_client(self, company_id: int):
+        """Get the Azure AI Project client for a company, if it has one"""
+        entry = self._entries.get(company_id)
+        return entry.client if entry is not None else None
     
     def get_rag_tool(self, company_id: int) -> Optional[RAGTool]:
         """Get RAG tool for a company"""
-        agent_key = f"company-{company_id}"
-        return self._rag_tools.get(agent_key)
+        entry = self._entries.get(company_id)
+        return entry.rag if entry is not None else None
     
     def is_mock_mode(self, company_id: int) -> bool:
         """Check if agent is in mock mode"""
-        agent = self.get_agent(company_id)
-        return agent.get('mode') == 'mock' if agent else True
+        entry = self._entries.get(company_id)
+        return entry is None or entry.is_mock
     
     def clear_agent(self, company_id: int):
         """Clear agent configuration for a company"""
-        agent_key = f"company-{company_id}"
-        
-        if agent_key in self._agents:
-            del self._agents[agent_key]
-        if agent_key in self._rag_tools:
-            del self._rag_tools[agent_key]
-        if agent_key in self._project_clients:
-            del self._project_clients[agent_key]
+        with self._lock:
+            self._entries.pop(company_id, None)
         
         logger.info(f"Cleared agent for company {company_id}")
     
+    def clear_all(self):
+        """Clear agent configuration for every company"""
+        with self._lock:
+            self._entries.clear()
+            self._shared_rag_tools.clear()
+            self._shared_project_clients.clear()
+        
+        logger.info("Cleared all agents")
+    
     def refresh_agent(self, company_id: int, azure_config: Dict) -> Optional[str]:
         """Refresh agent configuration"""
-        self.clear_agent(company_id)
-        return self.initialize_agent(company_id, azure_config)
+        with self._lock:
+            self.clear_agent(company_id)
+            return self.initialize_agent(company_id, azure_config)
 
 
 # Global agent loader instance
@@ -0,0 +1,19 @@
+"""
+Backend HTTP session for SOPHIA
+One pooled keep-alive session shared by every call to the TxDxAI backend
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared HTTP session for backend calls: keeps TCP/TLS connections alive
+# across requests instead of opening a new one per call
+backend_session = requests.Session()
+_backend_adapter = HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=100,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+)
+backend_session.mount('http://', _backend_adapter)
+backend_session.mount('https://', _backend_adapter)
@@ -4,22 +4,25 @@ Creates ticket stubs and prepares escalation to VictorIA
 """
 
 import logging
-import requests
 from typing import Dict, Optional
 from datetime import datetime
+import orjson
 from victor.ticket_models import TicketDraft, ActionRequest
-from victor.client_stub import send_ticket_to_victoria
+from victor.client_stub import send_ticket_to_victoria, check_victoria_status, cancel_victoria_ticket
 from config import config
+from .backend import backend_session
 
 logger = logging.getLogger(__name__)
 
+_TICKETS_URL = f"{config.BACKEND_URL}/tickets/agent-create"
+
 
 def create_ticket_stub(
     action_request: ActionRequest,
     company_id: int,
     user_id: int,
     auth_token: str,
-    context: Dict = {}
+    context: Optional[Dict] = None
 ) -> Dict:
     """
     Create a ticket stub for VictorIA escalation
@@ -35,18 +38,18 @@ def create_ticket_stub(
     Returns:
         Dict with ticket info and VictorIA response
     """
-    severity = _determine_severity(action_request)
+    severity = action_request.severity
     subject = f"Solicitud de Acción de Seguridad: {action_request.action_type}"
-    description = f"""
-Acción solicitada por el usuario: {action_request.original_message}
-
-Intención detectada: {action_request.intent}
-Tipo de acción: {action_request.action_type}
-Parámetros: {action_request.parameters}
-Requiere escalación: {action_request.requires_escalation}
-
-Esta acción requiere revisión manual y ejecución por VictorIA.
-    """.strip()
+    description = (
+        f"Acción solicitada por el usuario: {action_request.original_message}\n"
+        "\n"
+        f"Intención detectada: {action_request.intent}\n"
+        f"Tipo de acción: {action_request.action_type}\n"
+        f"Parámetros: {action_request.parameters}\n"
+        f"Requiere escalación: {action_request.requires_escalation}\n"
+        "\n"
+        "Esta acción requiere revisión manual y ejecución por VictorIA."
+    )
     
     # Create ticket in backend database (gets unique ID from PostgreSQL)
     backend_ticket = _create_backend_ticket(
@@ -104,7 +107,7 @@ def _create_backend_ticket(
     description: str,
     severity: str,
     auth_token: str,
-    metadata: Dict = {}
+    metadata: Optional[Dict] = None
 ) -> Optional[Dict]:
     """
     Create ticket in backend database (gets unique ID from PostgreSQL)
@@ -113,19 +116,19 @@ def _create_backend_ticket(
         Ticket data with backend-generated ID or None if failed
     """
     try:
-        response = requests.post(
-            f"{config.BACKEND_URL}/tickets/agent-create",
+        response = backend_session.post(
+            _TICKETS_URL,
             headers={
                 'Authorization': f'Bearer {auth_token}',
                 'Content-Type': 'application/json'
             },
-            json={
+            data=orjson.dumps({
                 'subject': subject,
                 'description': description,
                 'userId': user_id,
                 'severity': severity,
-                'metadata': metadata
-            },
+                'metadata': metadata or {}
+            }),
             timeout=10
         )
         
@@ -140,34 +143,23 @@ def _create_backend_ticket(
         return None
 
 
-def _determine_severity(action_request: ActionRequest) -> str:
-    """Determine ticket severity based on action request"""
-    if action_request.requires_escalation:
-        return "critical"
-    elif action_request.action_type in ["block_ip", "quarantine_device", "shutdown_system"]:
-        return "high"
-    elif action_request.intent == "action":
-        return "medium"
-    else:
-        return "low"
-
-
 def _create_escalation_message_with_id(ticket_id: str, severity: str, victoria_response: Dict) -> str:
     """Create user-friendly escalation message with ticket ID"""
     estimated_time = victoria_response.get('estimated_response_time', '15 minutes')
     
-    return f"""
-🎫 **Este caso requiere intervención de VictorIA**
-
-Su solicitud ha sido escalada para revisión manual:
-- **Ticket ID**: {ticket_id}
-- **Severidad**: {severity}
-- **Tiempo estimado de respuesta**: {estimated_time}
-
-VictorIA revisará su solicitud y tomará las acciones necesarias. Recibirá una notificación cuando se complete.
-
-💡 **Nota**: Las acciones de seguridad críticas requieren aprobación manual para garantizar la seguridad del sistema.
-    """.strip()
+    # Adjacent literals compile into a single string build, with no .strip() copy
+    return (
+        "🎫 **Este caso requiere intervención de VictorIA**\n"
+        "\n"
+        "Su solicitud ha sido escalada para revisión manual:\n"
+        f"- **Ticket ID**: {ticket_id}\n"
+        f"- **Severidad**: {severity}\n"
+        f"- **Tiempo estimado de respuesta**: {estimated_time}\n"
+        "\n"
+        "VictorIA revisará su solicitud y tomará las acciones necesarias. Recibirá una notificación cuando se complete.\n"
+        "\n"
+        "💡 **Nota**: Las acciones de seguridad críticas requieren aprobación manual para garantizar la seguridad del sistema."
+    )
 
 
 def check_handoff_status(ticket_id: str) -> Dict:
@@ -180,7 +172,6 @@ def check_handoff_status(ticket_id: str) -> Dict:
     Returns:
         Dict with ticket status
     """
-    from victor.client_stub import check_victoria_status
     return check_victoria_status(ticket_id)
 
 
@@ -194,5 +185,4 @@ def cancel_handoff(ticket_id: str) -> Dict:
     Returns:
         Dict with cancellation status
     """
-    from victor.client_stub import cancel_victoria_ticket
     return cancel_victoria_ticket(ticket_id)
@@ -4,17 +4,71 @@ Detects user intent and routes to appropriate handler
 """
 
 import logging
-from typing import Dict, Tuple
+import re
+from typing import Dict, Iterable, Pattern, Tuple
 from victor.ticket_models import ActionRequest
 
 logger = logging.getLogger(__name__)
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+    logger.info("pyahocorasick not available, matching intent keywords with regex")
+
+# Tags stored in the keyword automaton
+_ACTION_HIT = 1
+_QUERY_HIT = 2
+
+_IP_RE = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
+# Whitespace-separated word following a standalone device/host/server word
+_DEVICE_RE = re.compile(r'(?<!\S)(?ai:device|host|server)(?=\s+(\S+))')
+
+
+# Terms that decide the action type, found in one scan of the message. The
+# lookahead reports every occurrence, overlapping ones included, like `in`.
+_ACTION_TERMS = (
+    'block', 'ip', 'quarantine', 'isolate', 'shutdown', 'shut down', 'delete',
+    'user', 'disable', 'firewall', 'emergency', 'configure', 'change'
+)
+_ACTION_TERM_RE = re.compile('(?=(' + '|'.join(map(re.escape, _ACTION_TERMS)) + '))')
+_ACTION_TERM_BITS = {term: 1 << bit for bit, term in enumerate(_ACTION_TERMS)}
+
+
+def _terms_mask(*terms: str) -> int:
+    mask = 0
+    for term in terms:
+        mask |= _ACTION_TERM_BITS[term]
+    return mask
+
+
+# Action types in priority order: the first rule whose terms all appear wins
+_ACTION_RULES = (
+    (_terms_mask('block', 'ip'), 'block_ip'),
+    (_terms_mask('quarantine'), 'quarantine_device'),
+    (_terms_mask('isolate'), 'quarantine_device'),
+    (_terms_mask('shutdown'), 'shutdown_system'),
+    (_terms_mask('shut down'), 'shutdown_system'),
+    (_terms_mask('delete', 'user'), 'delete_user'),
+    (_terms_mask('disable', 'firewall'), 'disable_firewall'),
+    (_terms_mask('emergency'), 'emergency_response'),
+    (_terms_mask('block'), 'block_resource'),
+    (_terms_mask('configure'), 'configuration_change'),
+    (_terms_mask('change'), 'configuration_change'),
+)
+
+
+def _keyword_pattern(keywords: Iterable[str]) -> Pattern:
+    """Compile keywords into one alternation matching any of them as a substring"""
+    return re.compile('|'.join(map(re.escape, sorted(keywords, key=len, reverse=True))))
+
 
 class IntentRouter:
     """Routes user messages based on detected intent"""
     
     # Action keywords that indicate user wants to perform an action (English & Spanish)
-    ACTION_KEYWORDS = {
+    ACTION_KEYWORDS = frozenset({
         "block", "quarantine", "isolate", "shutdown", "disable", "remove",
         "delete", "terminate", "kill", "stop", "ban", "restrict",
         "execute", "run", "deploy", "configure", "change", "modify",
@@ -22,16 +76,20 @@ class IntentRouter:
         "deshabilita", "deshabilitar", "elimina", "eliminar", "detén", "detener",
         "ejecuta", "ejecutar", "despliega", "desplegar", "configura", "configurar",
         "cambia", "cambiar", "modifica", "modificar", "borra", "borrar"
-    }
+    })
     
     # Query keywords for informational requests (English & Spanish)
-    QUERY_KEYWORDS = {
+    QUERY_KEYWORDS = frozenset({
         "show", "list", "get", "display", "what", "when", "where", "how",
         "status", "check", "see", "view", "tell", "explain", "describe",
         "muestra", "mostrar", "lista", "listar", "obtén", "obtener", "qué", "cuándo",
         "dónde", "cómo", "estado", "verifica", "verificar", "ve", "ver", "dime",
         "explica", "explicar", "describe", "describir", "hay", "cuáles", "cuál"
-    }
+    })
+    
+    # One scan of the message per keyword set instead of one per keyword
+    _ACTION_RE = _keyword_pattern(ACTION_KEYWORDS)
+    _QUERY_RE = _keyword_pattern(QUERY_KEYWORDS)
     
     # High-risk actions that always require VictorIA escalation
     HIGH_RISK_ACTIONS = {
@@ -39,6 +97,18 @@ class IntentRouter:
         "disable_firewall", "emergency_response", "isolate_network"
     }
     
+    def __init__(self):
+        # One Aho-Corasick scan reports hits from both keyword sets; the
+        # compiled regexes above are the fallback without pyahocorasick
+        self._keyword_automaton = None
+        if AHOCORASICK_AVAILABLE:
+            automaton = ahocorasick.Automaton()
+            for tag, keywords in ((_ACTION_HIT, self.ACTION_KEYWORDS), (_QUERY_HIT, self.QUERY_KEYWORDS)):
+                for keyword in keywords:
+                    automaton.add_word(keyword, automaton.get(keyword, 0) | tag)
+            automaton.make_automaton()
+            self._keyword_automaton = automaton
+    
     def detect_intent(self, message: str) -> Tuple[str, ActionRequest]:
         """
         Detect user intent from message
@@ -48,11 +118,14 @@ class IntentRouter:
             intent_type: 'query', 'action', or 'unknown'
         """
         message_lower = message.lower()
-        words = message_lower.split()
         
         # Check for action keywords
-        has_action = any(keyword in message_lower for keyword in self.ACTION_KEYWORDS)
-        has_query = any(keyword in message_lower for keyword in self.QUERY_KEYWORDS)
+        if not self.QUERY_KEYWORDS.isdisjoint(message_lower.split()):
+            # Any query keyword makes this a query whatever else it contains,
+            # so a whole-word hit settles it without the substring scan
+            has_action, has_query = False, True
+        else:
+            has_action, has_query = self._match_keywords(message_lower)
         
         # Determine action type if it's an action intent
         action_type = self._determine_action_type(message_lower)
@@ -63,7 +136,7 @@ class IntentRouter:
             action_request = ActionRequest(
                 intent="action",
                 action_type=action_type,
-                parameters=self._extract_parameters(message),
+                parameters=self._extract_parameters(message, message_lower),
                 original_message=message,
                 requires_escalation=requires_escalation
             )
@@ -91,51 +164,53 @@ class IntentRouter:
             )
             return ("unknown", action_request)
     
+    def _match_keywords(self, message_lower: str) -> Tuple[bool, bool]:
+        """Whether the message contains any action keyword and any query keyword"""
+        if self._keyword_automaton is None:
+            return (
+                self._ACTION_RE.search(message_lower) is not None,
+                self._QUERY_RE.search(message_lower) is not None
+            )
+        
+        hits = 0
+        for _, tags in self._keyword_automaton.iter(message_lower):
+            hits |= tags
+            if hits == _ACTION_HIT | _QUERY_HIT:
+                break
+        return bool(hits & _ACTION_HIT), bool(hits & _QUERY_HIT)
+    
     def _determine_action_type(self, message: str) -> str:
         """Determine specific action type from message"""
-        if "block" in message and "ip" in message:
-            return "block_ip"
-        elif "quarantine" in message or "isolate" in message:
-            return "quarantine_device"
-        elif "shutdown" in message or "shut down" in message:
-            return "shutdown_system"
-        elif "delete" in message and "user" in message:
-            return "delete_user"
-        elif "disable" in message and "firewall" in message:
-            return "disable_firewall"
-        elif "emergency" in message:
-            return "emergency_response"
-        elif "block" in message:
-            return "block_resource"
-        elif "configure" in message or "change" in message:
-            return "configuration_change"
-        else:
-            return "general_action"
+        found = 0
+        for term in _ACTION_TERM_RE.findall(message):
+            found |= _ACTION_TERM_BITS[term]
+        
+        for required, action_type in _ACTION_RULES:
+            if found & required == required:
+                return action_type
+        return "general_action"
     
-    def _extract_parameters(self, message: str) -> Dict:
-        """Extract parameters from action message"""
+    def _extract_parameters(self, message: str, message_lower: str) -> Dict:
+        """Extract parameters from action message (and its lowercased copy)"""
         params = {}
         
         # Simple IP extraction
-        import re
-        ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-        ips = re.findall(ip_pattern, message)
+        ips = _IP_RE.findall(message)
         if ips:
             params['ip_addresses'] = ips
         
         # Extract device/host names (simple heuristic)
-        if "device" in message.lower() or "host" in message.lower():
-            words = message.split()
-            for i, word in enumerate(words):
-                if word.lower() in ["device", "host", "server"] and i + 1 < len(words):
-                    params['device_name'] = words[i + 1].strip('.,!?')
+        if "device" in message_lower or "host" in message_lower:
+            device_names = _DEVICE_RE.findall(message)
+            if device_names:
+                params['device_name'] = device_names[-1].strip('.,!?')
         
         # Extract severity if mentioned
-        if "critical" in message.lower():
+        if "critical" in message_lower:
             params['severity'] = "critical"
-        elif "high" in message.lower():
+        elif "high" in message_lower:
             params['severity'] = "high"
-        elif "urgent" in message.lower():
+        elif "urgent" in message_lower:
             params['severity'] = "urgent"
         
         return params
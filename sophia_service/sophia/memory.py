@@ -4,49 +4,116 @@ Handles thread creation, session persistence, and conversation context
 """
 
 import logging
-from typing import Dict, Optional, List
-from datetime import datetime
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Deque, Dict, Optional, List
+from datetime import datetime, timezone
 from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 
+# Least recently used threads are dropped beyond this many
+MAX_SESSIONS = 10_000
+# Only the most recent messages of a thread are kept
+MAX_MESSAGES_PER_THREAD = 200
 
-@dataclass
+
+# Random bytes drawn from the OS at once, sliced into thread tokens
+_TOKEN_ENTROPY_BYTES = 4096
+_THREAD_TOKEN_BYTES = 8
+_token_buffer = memoryview(b'')
+_token_buffer_pid = None
+_token_lock = threading.Lock()
+
+
+def _thread_token() -> str:
+    """
+    Random hex token for a thread ID
+    
+    Cryptographically random like secrets.token_hex, but one getrandom call
+    serves 512 tokens. The buffer is discarded after a fork so worker
+    processes never hand out the same tokens.
+    """
+    global _token_buffer, _token_buffer_pid
+    with _token_lock:
+        if len(_token_buffer) < _THREAD_TOKEN_BYTES or _token_buffer_pid != os.getpid():
+            _token_buffer = memoryview(secrets.token_bytes(_TOKEN_ENTROPY_BYTES))
+            _token_buffer_pid = os.getpid()
+        token = _token_buffer[:_THREAD_TOKEN_BYTES]
+        _token_buffer = _token_buffer[_THREAD_TOKEN_BYTES:]
+    return token.hex()
+
+
+def _iso_timestamp(ns: int) -> str:
+    """
+    Format a time.time_ns() timestamp as naive ISO 8601 UTC
+    
+    No offset suffix, matching the datetime.utcnow().isoformat() values the
+    threads API has always returned
+    """
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+@dataclass(slots=True)
 class ConversationContext:
     """Stores conversation context for a session"""
     thread_id: str
     company_id: int
     user_id: int
-    messages: List[Dict] = field(default_factory=list)
-    created_at: datetime = field(default_factory=datetime.utcnow)
-    last_updated: datetime = field(default_factory=datetime.utcnow)
+    messages: Deque[Dict] = field(default_factory=lambda: deque(maxlen=MAX_MESSAGES_PER_THREAD))
+    # Nanoseconds since the epoch; formatted only when read
+    created_at: int = field(default_factory=time.time_ns)
+    last_updated: int = field(default_factory=time.time_ns)
     metadata: Dict = field(default_factory=dict)
     
+    @property
+    def created_at_iso(self) -> str:
+        return _iso_timestamp(self.created_at)
+    
+    @property
+    def last_updated_iso(self) -> str:
+        return _iso_timestamp(self.last_updated)
+    
     def add_message(self, role: str, content: str):
         """Add a message to conversation history"""
-        self.messages.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        self.last_updated = datetime.utcnow()
+        ts = time.time_ns()
+        self.messages.append({"role": role, "content": content, "ts": ts})
+        self.last_updated = ts
+    
+    def serialize_messages(self) -> List[Dict]:
+        """
+        Messages with their ISO 8601 timestamps, as returned by the API
+        
+        Iterates the message deque, so a shared context must only be read
+        through MemoryManager, under its lock
+        """
+        return [
+            {"role": m["role"], "content": m["content"], "timestamp": _iso_timestamp(m["ts"])}
+            for m in self.messages
+        ]
     
     def get_recent_messages(self, limit: int = 10) -> List[Dict]:
-        """Get recent messages from conversation"""
-        return self.messages[-limit:] if self.messages else []
+        """Get recent messages from conversation (see serialize_messages on locking)"""
+        return list(islice(self.messages, max(0, len(self.messages) - limit), None))
 
 
 class MemoryManager:
     """Manages conversation memory and threading"""
     
-    def __init__(self):
-        self._sessions: Dict[str, ConversationContext] = {}
-        self._company_threads: Dict[int, List[str]] = {}
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, ConversationContext] = OrderedDict()
+        # Thread IDs per company as insertion-ordered sets (dict keys)
+        self._company_threads: Dict[int, Dict[str, None]] = {}
+        self._lock = threading.RLock()
     
     def create_thread(self, company_id: int, user_id: int) -> str:
         """Create new conversation thread"""
-        import secrets
-        thread_id = f"thread_{company_id}_{secrets.token_hex(8)}"
+        thread_id = f"thread_{company_id}_{_thread_token()}"
         
         context = ConversationContext(
             thread_id=thread_id,
@@ -54,55 +121,93 @@ class MemoryManager:
             user_id=user_id
         )
         
-        self._sessions[thread_id] = context
-        
-        if company_id not in self._company_threads:
-            self._company_threads[company_id] = []
-        self._company_threads[company_id].append(thread_id)
+        with self._lock:
+            self._sessions[thread_id] = context
+            self._company_threads.setdefault(company_id, {})[thread_id] = None
+            
+            while len(self._sessions) > self.max_sessions:
+                self._evict_oldest()
         
         logger.info(f"Created new thread {thread_id} for company {company_id}")
         return thread_id
     
     def get_context(self, thread_id: str) -> Optional[ConversationContext]:
         """Get conversation context by thread ID"""
-        return self._sessions.get(thread_id)
+        with self._lock:
+            context = self._sessions.get(thread_id)
+            if context:
+                self._sessions.move_to_end(thread_id)
+            return context
+    
+    def _evict_oldest(self):
+        """Drop the least recently used thread; caller holds the lock"""
+        thread_id, context = self._sessions.popitem(last=False)
+        self._forget_company_thread(context.company_id, thread_id)
+        logger.debug(f"Evicted thread {thread_id}")
+    
+    def _forget_company_thread(self, company_id: int, thread_id: str):
+        """Drop a thread from its company's index; caller holds the lock"""
+        company_threads = self._company_threads.get(company_id)
+        if company_threads is not None:
+            company_threads.pop(thread_id, None)
+            if not company_threads:
+                del self._company_threads[company_id]
     
     def add_message(self, thread_id: str, role: str, content: str):
         """Add message to thread"""
-        context = self.get_context(thread_id)
-        if context:
-            context.add_message(role, content)
-        else:
+        with self._lock:
+            context = self.get_context(thread_id)
+            if context:
+                context.add_message(role, content)
+        if not context:
             logger.warning(f"Thread {thread_id} not found for adding message")
     
+    def get_thread_history(self, thread_id: str) -> Optional[Dict]:
+        """
+        Snapshot of a thread's owner, serialized messages and timestamps
+        
+        Built under the lock: iterating the message deque while another
+        request appends to it raises RuntimeError
+        """
+        with self._lock:
+            context = self.get_context(thread_id)
+            if context is None:
+                return None
+            return {
+                "company_id": context.company_id,
+                "user_id": context.user_id,
+                "messages": context.serialize_messages(),
+                "created_at": context.created_at_iso,
+                "last_updated": context.last_updated_iso
+            }
+    
+    def get_recent_messages(self, thread_id: str, limit: int = 10) -> List[Dict]:
+        """Get a thread's most recent messages; empty if the thread is unknown"""
+        with self._lock:
+            context = self.get_context(thread_id)
+            return context.get_recent_messages(limit) if context else []
+    
     def get_company_threads(self, company_id: int) -> List[str]:
         """Get all thread IDs for a company"""
-        return self._company_threads.get(company_id, [])
+        with self._lock:
+            return list(self._company_threads.get(company_id, ()))
     
     def clear_thread(self, thread_id: str):
         """Clear a specific thread"""
-        if thread_id in self._sessions:
-            context = self._sessions[thread_id]
-            company_id = context.company_id
-            
-            del self._sessions[thread_id]
+        with self._lock:
+            context = self._sessions.pop(thread_id, None)
+            if context is None:
+                return
             
-            if company_id in self._company_threads:
-                self._company_threads[company_id] = [
-                    tid for tid in self._company_threads[company_id] if tid != thread_id
-                ]
-            
-            logger.info(f"Cleared thread {thread_id}")
+            self._forget_company_thread(context.company_id, thread_id)
+        
+        logger.info(f"Cleared thread {thread_id}")
     
     def clear_company_threads(self, company_id: int):
         """Clear all threads for a company"""
-        threads = self.get_company_threads(company_id)
-        for thread_id in threads:
-            if thread_id in self._sessions:
-                del self._sessions[thread_id]
-        
-        if company_id in self._company_threads:
-            del self._company_threads[company_id]
+        with self._lock:
+            for thread_id in self._company_threads.pop(company_id, ()):
+                self._sessions.pop(thread_id, None)
         
         logger.info(f"Cleared all threads for company {company_id}")
 
@@ -7,43 +7,114 @@ from typing import List, Dict
 from datetime import datetime, timedelta
 import random
 
+# random.uniform/randint are Python-level wrappers; drawing from the C-level
+# random() directly skips one interpreter frame per value
+_random = random.random
 
-def get_palo_alto_alerts() -> List[Dict]:
-    """Mock Palo Alto Networks alerts"""
-    return [
+# (field, low, high) of each uniformly drawn mock metric
+_GRAFANA_METRIC_RANGES = (
+    ("cpu_usage", 20, 85),
+    ("memory_usage", 40, 90),
+    ("disk_usage", 30, 75),
+    ("network_in", 100, 1000),
+    ("network_out", 50, 800)
+)
+_MERAKI_BANDWIDTH_RANGES = (
+    ("upload_mbps", 10, 100),
+    ("download_mbps", 50, 500)
+)
+
+_SPLUNK_LOG_TYPES = ("INFO", "WARN", "ERROR", "DEBUG")
+_SPLUNK_SOURCES = ("web-server", "api-gateway", "database", "auth-service")
+_SPLUNK_LOG_INTERVAL = timedelta(minutes=5)
+
+
+# (alert, age) pairs; only the timestamp of each alert changes between calls.
+# The "timestamp" placeholder keeps the key in its place in the output.
+_PALO_ALTO_ALERTS = (
+    (
         {
             "id": "PA-2025-001",
             "severity": "high",
             "message": "Suspicious outbound connection detected",
             "source_ip": "192.168.1.105",
             "destination": "suspicious-domain.com",
-            "timestamp": (datetime.utcnow() - timedelta(minutes=15)).isoformat(),
+            "timestamp": None,
             "action": "blocked"
         },
+        timedelta(minutes=15)
+    ),
+    (
         {
             "id": "PA-2025-002",
             "severity": "medium",
             "message": "Multiple failed login attempts",
             "source_ip": "10.0.0.45",
             "attempts": 12,
-            "timestamp": (datetime.utcnow() - timedelta(hours=1)).isoformat(),
+            "timestamp": None,
             "action": "monitored"
-        }
-    ]
+        },
+        timedelta(hours=1)
+    )
+)
+_WAZUH_ALERTS = (
+    (
+        {
+            "id": "WZ-2025-101",
+            "rule_id": 5501,
+            "level": 8,
+            "description": "Integrity checksum changed",
+            "agent": "web-server-01",
+            "file": "/etc/passwd",
+            "timestamp": None
+        },
+        timedelta(hours=2)
+    ),
+    (
+        {
+            "id": "WZ-2025-102",
+            "rule_id": 5402,
+            "level": 5,
+            "description": "New file added to monitored directory",
+            "agent": "api-server-02",
+            "file": "/var/www/uploads/new_file.php",
+            "timestamp": None
+        },
+        timedelta(minutes=30)
+    )
+)
+
+
+def _stamp_alerts(alerts) -> List[Dict]:
+    """Fresh copies of (alert, age) templates, timestamped against one clock read"""
+    now = datetime.utcnow()
+    return [{**alert, "timestamp": (now - age).isoformat()} for alert, age in alerts]
+
+
+def _uniform_values(ranges) -> Dict:
+    """One uniform draw per (field, low, high), rounded to 2 decimals"""
+    return {name: round(low + (high - low) * _random(), 2) for name, low, high in ranges}
+
+
+def get_palo_alto_alerts() -> List[Dict]:
+    """Mock Palo Alto Networks alerts"""
+    return _stamp_alerts(_PALO_ALTO_ALERTS)
 
 
 def get_splunk_logs(query: str = "*", limit: int = 10) -> List[Dict]:
     """Mock Splunk logs"""
-    log_types = ["INFO", "WARN", "ERROR", "DEBUG"]
-    sources = ["web-server", "api-gateway", "database", "auth-service"]
+    # One batched draw per column and one clock read for the whole batch
+    levels = random.choices(_SPLUNK_LOG_TYPES, k=limit)
+    sources = random.choices(_SPLUNK_SOURCES, k=limit)
+    now = datetime.utcnow()
     
     return [
         {
             "id": f"SPL-{i:04d}",
-            "level": random.choice(log_types),
-            "source": random.choice(sources),
+            "level": levels[i],
+            "source": sources[i],
             "message": f"Mock log entry {i}: {query}",
-            "timestamp": (datetime.utcnow() - timedelta(minutes=i*5)).isoformat(),
+            "timestamp": (now - _SPLUNK_LOG_INTERVAL * i).isoformat(),
             "metadata": {"query": query, "mock": True}
         }
         for i in range(limit)
@@ -52,40 +123,16 @@ def get_splunk_logs(query: str = "*", limit: int = 10) -> List[Dict]:
 
 def get_grafana_metrics() -> Dict:
     """Mock Grafana system metrics"""
-    return {
-        "cpu_usage": round(random.uniform(20, 85), 2),
-        "memory_usage": round(random.uniform(40, 90), 2),
-        "disk_usage": round(random.uniform(30, 75), 2),
-        "network_in": round(random.uniform(100, 1000), 2),
-        "network_out": round(random.uniform(50, 800), 2),
-        "active_connections": random.randint(50, 500),
-        "timestamp": datetime.utcnow().isoformat(),
-        "status": "healthy"
-    }
+    metrics = _uniform_values(_GRAFANA_METRIC_RANGES)
+    metrics["active_connections"] = 50 + int(_random() * 451)
+    metrics["timestamp"] = datetime.utcnow().isoformat()
+    metrics["status"] = "healthy"
+    return metrics
 
 
 def get_wazuh_alerts() -> List[Dict]:
     """Mock Wazuh security alerts"""
-    return [
-        {
-            "id": "WZ-2025-101",
-            "rule_id": 5501,
-            "level": 8,
-            "description": "Integrity checksum changed",
-            "agent": "web-server-01",
-            "file": "/etc/passwd",
-            "timestamp": (datetime.utcnow() - timedelta(hours=2)).isoformat()
-        },
-        {
-            "id": "WZ-2025-102",
-            "rule_id": 5402,
-            "level": 5,
-            "description": "New file added to monitored directory",
-            "agent": "api-server-02",
-            "file": "/var/www/uploads/new_file.php",
-            "timestamp": (datetime.utcnow() - timedelta(minutes=30)).isoformat()
-        }
-    ]
+    return _stamp_alerts(_WAZUH_ALERTS)
 
 
 def get_meraki_network_status() -> Dict:
@@ -96,10 +143,7 @@ def get_meraki_network_status() -> Dict:
         "status": "online",
         "device_count": 15,
         "active_clients": 42,
-        "bandwidth_usage": {
-            "upload_mbps": round(random.uniform(10, 100), 2),
-            "download_mbps": round(random.uniform(50, 500), 2)
-        },
+        "bandwidth_usage": _uniform_values(_MERAKI_BANDWIDTH_RANGES),
         "alerts": [
             {
                 "type": "latency",
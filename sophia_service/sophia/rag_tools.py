@@ -3,11 +3,184 @@ RAG (Retrieval-Augmented Generation) Tools for SOPHIA
 Integrates with Azure AI Search for knowledge retrieval
 """
 
+import copy
+import heapq
 import logging
-from typing import Dict, List, Optional
+import re
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate, islice
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+from config import CountingTTLCache
 
 logger = logging.getLogger(__name__)
 
+# Search results reused for repeated (query, top_k) lookups
+SEARCH_CACHE_MAX_ENTRIES = 512
+SEARCH_CACHE_TTL_SECONDS = 300
+# Index fields read from Azure Search results
+SEARCH_SELECT_FIELDS = ["content", "title", "source", "category"]
+
+
+# Base de conocimiento mock
+_MOCK_KNOWLEDGE = (
+    {
+        "content": "SOPHIA es un agente de IA multi-tenant para operaciones de ciberseguridad. Puede analizar alertas de seguridad, proporcionar inteligencia de amenazas y coordinar la respuesta a incidentes.",
+        "title": "Resumen de SOPHIA",
+        "score": 0.95,
+        "metadata": {"source": "documentation", "category": "sophia"}
+    },
+    {
+        "content": "Un firewall es un sistema de seguridad de red que monitorea y controla el tráfico entrante y saliente basándose en reglas de seguridad predeterminadas. Actúa como una barrera entre una red interna confiable y redes externas no confiables como Internet. Los firewalls pueden ser de hardware, software o una combinación de ambos. Funciones principales: filtrado de paquetes, inspección de estado, prevención de intrusiones y control de aplicaciones.",
+        "title": "¿Qué es un Firewall?",
+        "score": 0.92,
+        "metadata": {"source": "education", "category": "concepts"}
+    },
+    {
+        "content": "Para bloquear una dirección IP, necesitas configurar reglas de firewall. Esta acción requiere aprobación de VictorIA para cumplir con las políticas de seguridad.",
+        "title": "Procedimientos de Bloqueo de IP",
+        "score": 0.88,
+        "metadata": {"source": "security-procedures", "category": "procedures"}
+    },
+    {
+        "content": "Un IDS (Sistema de Detección de Intrusiones) es una herramienta de seguridad que monitorea el tráfico de red en busca de actividades sospechosas y violaciones de políticas. A diferencia de un firewall que bloquea el tráfico, un IDS solo detecta y alerta sobre amenazas. Un IPS (Sistema de Prevención de Intrusiones) va un paso más allá al detectar Y bloquear automáticamente las amenazas.",
+        "title": "IDS vs IPS",
+        "score": 0.90,
+        "metadata": {"source": "education", "category": "concepts"}
+    },
+    {
+        "content": "Un ataque DDoS (Distributed Denial of Service) es un intento malicioso de interrumpir el tráfico normal de un servidor, servicio o red inundándolo con tráfico de Internet. Los ataques DDoS utilizan múltiples sistemas comprometidos como fuentes de tráfico de ataque. Las defensas incluyen rate limiting, filtrado de tráfico, CDN y servicios anti-DDoS especializados.",
+        "title": "Ataques DDoS",
+        "score": 0.89,
+        "metadata": {"source": "education", "category": "threats"}
+    },
+    {
+        "content": "Las alertas de seguridad pueden obtenerse desde Palo Alto Networks, Splunk, Wazuh y otras herramientas de seguridad integradas.",
+        "title": "Fuentes de Alertas de Seguridad",
+        "score": 0.82,
+        "metadata": {"source": "integrations", "category": "alerts"}
+    },
+    {
+        "content": "Las acciones de seguridad de alto riesgo como cuarentena de dispositivos, aislamiento de red o apagado de sistemas requieren aprobación manual a través de escalación a VictorIA.",
+        "title": "Política de Escalación de Acciones de Seguridad",
+        "score": 0.79,
+        "metadata": {"source": "policies", "category": "escalation"}
+    },
+    {
+        "content": "Las métricas del sistema y datos de rendimiento pueden monitorearse a través de dashboards de Grafana. Las métricas clave incluyen CPU, memoria, uso de disco y throughput de red.",
+        "title": "Monitoreo de Sistemas",
+        "score": 0.75,
+        "metadata": {"source": "monitoring", "category": "metrics"}
+    },
+    {
+        "content": "Un ransomware es un tipo de malware que cifra los archivos de la víctima y exige un pago (rescate) para restaurar el acceso. Las medidas preventivas incluyen: backups regulares, actualizaciones de seguridad, educación de usuarios, segmentación de red y sistemas de detección de comportamiento anómalo.",
+        "title": "Ransomware",
+        "score": 0.87,
+        "metadata": {"source": "education", "category": "threats"}
+    },
+    {
+        "content": "La autenticación multifactor (MFA) es un método de seguridad que requiere que los usuarios proporcionen dos o más factores de verificación para acceder a un recurso. Los factores pueden ser: algo que sabes (contraseña), algo que tienes (token/teléfono), o algo que eres (biometría). MFA reduce significativamente el riesgo de acceso no autorizado.",
+        "title": "Autenticación Multifactor (MFA)",
+        "score": 0.86,
+        "metadata": {"source": "education", "category": "concepts"}
+    }
+)
+
+
+
+@dataclass(slots=True, frozen=True)
+class _MockDoc:
+    """A mock document with the scoring features that do not depend on the query"""
+    doc: Dict
+    # Lowercased content + title, for substring matching
+    text: str
+    is_metrics: bool
+    is_alerts: bool
+    # Score adjustment when the query asks what something is
+    concept_bonus: int
+
+
+def _index_mock_doc(doc: Dict) -> _MockDoc:
+    category = doc["metadata"]["category"]
+    if category in ('concepts', 'education', 'threats'):
+        concept_bonus = 15  # Strong boost for educational content
+    elif category == 'procedures':
+        concept_bonus = -5  # Reduce procedural content for conceptual questions
+    else:
+        concept_bonus = 0
+    return _MockDoc(
+        doc=doc,
+        text=(doc["content"] + " " + doc["title"]).lower(),
+        is_metrics=category == 'metrics',
+        is_alerts=category == 'alerts',
+        concept_bonus=concept_bonus
+    )
+
+
+_MOCK_INDEX = tuple(_index_mock_doc(doc) for doc in _MOCK_KNOWLEDGE)
+
+
+@lru_cache(maxsize=8192)
+def _mock_postings(term: str) -> Tuple[int, ...]:
+    """
+    Positions in _MOCK_INDEX of the documents containing term
+    
+    Built lazily per term rather than from a tokenized index: terms match
+    as substrings of the document text, so 'alert' finds 'alertas'.
+    """
+    return tuple(i for i, mock in enumerate(_MOCK_INDEX) if term in mock.text)
+
+
+# Phrases marking "what is" questions, which favour educational content
+_CONCEPT_PHRASES = ('qué es', 'que es', 'what is', 'cómo funciona', 'explica', 'explain')
+
+# Question topics for generate_natural_response, matched as plain substrings
+# of the lowercased query (e.g. 'bloque' also matches 'bloqueo')
+_IDENTITY_QUERY_RE = re.compile('nombre|llamas|eres|quien|quién')
+_ALERT_QUERY_RE = re.compile('alertas|alert|avisos|notificaciones')
+_BLOCK_QUERY_RE = re.compile('bloque|bloquear|firewall')
+_METRICS_QUERY_RE = re.compile('métrica|monitoreo|rendimiento|cpu|memoria|sistema')
+# Document terms that make a result fit the topic
+_BLOCK_DOC_RE = re.compile('bloque|firewall')
+_METRICS_DOC_RE = re.compile('métrica|monitoreo|sistema')
+# Question topics in the order generate_natural_response checks them
+_QUERY_TOPICS = (
+    ('identity', _IDENTITY_QUERY_RE),
+    ('alerts', _ALERT_QUERY_RE),
+    ('block', _BLOCK_QUERY_RE),
+    ('metrics', _METRICS_QUERY_RE)
+)
+
+
+@dataclass(slots=True, frozen=True)
+class _QueryFeatures:
+    """What the mock search and natural responses need to know about a query"""
+    lower: str
+    # Words longer than 2 characters, duplicates kept (each one scores)
+    words: Tuple[str, ...]
+    is_concept_question: bool
+    asks_metrics: bool
+    asks_alerts: bool
+    # First matching entry of _QUERY_TOPICS, or None
+    topic: Optional[str]
+
+
+@lru_cache(maxsize=4096)
+def _analyze_query(query: str) -> _QueryFeatures:
+    """Analyze a query once; search and response rendering share the result"""
+    query_lower = query.lower()
+    return _QueryFeatures(
+        lower=query_lower,
+        words=tuple(word for word in query_lower.split() if len(word) > 2),
+        is_concept_question=any(phrase in query_lower for phrase in _CONCEPT_PHRASES),
+        asks_metrics='métrica' in query_lower,
+        asks_alerts='alert' in query_lower,
+        topic=next((topic for topic, pattern in _QUERY_TOPICS if pattern.search(query_lower)), None)
+    )
+
 
 class RAGTool:
     """RAG tool for knowledge retrieval using Azure AI Search"""
@@ -22,24 +195,53 @@ class RAGTool:
         self.search_key = search_key
         self.index_name = index_name
         self.search_client = None
+        self._search_cache = CountingTTLCache(
+            maxsize=SEARCH_CACHE_MAX_ENTRIES,
+            ttl=SEARCH_CACHE_TTL_SECONDS
+        )
+        # Formatted contexts and replies, keyed on the lowercased query
+        self._rendered_cache = CountingTTLCache(
+            maxsize=SEARCH_CACHE_MAX_ENTRIES,
+            ttl=SEARCH_CACHE_TTL_SECONDS
+        )
+        self._search_cache_lock = threading.RLock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # The Azure SDK is imported and the client built on the first search
+        self._client_pending = bool(search_endpoint and search_key)
+        self._client_lock = threading.Lock()
         
-        if search_endpoint and search_key:
-            try:
-                from azure.search.documents import SearchClient
-                from azure.core.credentials import AzureKeyCredential
-                
-                self.search_client = SearchClient(
-                    endpoint=search_endpoint,
-                    index_name=index_name,
-                    credential=AzureKeyCredential(search_key)
-                )
-                logger.info(f"RAG initialized with Azure AI Search: {search_endpoint}")
-            except Exception as e:
-                logger.warning(f"Failed to initialize Azure AI Search: {e}")
-                self.search_client = None
+        if self._client_pending:
+            logger.info(f"RAG configured for Azure AI Search: {search_endpoint}")
         else:
             logger.info("RAG initialized in mock mode (no Azure Search credentials)")
     
+    def _get_search_client(self):
+        """Get the Azure Search client, creating it on first use; None in mock mode"""
+        if self._client_pending:
+            with self._client_lock:
+                if self._client_pending:
+                    self.search_client = self._create_search_client()
+                    self._client_pending = False
+        return self.search_client
+    
+    def _create_search_client(self):
+        """Create the Azure Search client, or None if the SDK or credentials fail"""
+        try:
+            from azure.search.documents import SearchClient
+            from azure.core.credentials import AzureKeyCredential
+            
+            search_client = SearchClient(
+                endpoint=self.search_endpoint,
+                index_name=self.index_name,
+                credential=AzureKeyCredential(self.search_key)
+            )
+            logger.info(f"RAG initialized with Azure AI Search: {self.search_endpoint}")
+            return search_client
+        except Exception as e:
+            logger.warning(f"Failed to initialize Azure AI Search: {e}")
+            return None
+    
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """
         Search knowledge base for relevant documents
@@ -51,144 +253,142 @@ class RAGTool:
         Returns:
             List of relevant documents
         """
-        if self.search_client:
-            return self._search_azure(query, top_k)
+        documents, _ = self._search_shared(query, top_k)
+        return copy.deepcopy(documents)
+    
+    def _search_shared(self, query: str, top_k: int) -> Tuple[List[Dict], bool]:
+        """
+        Search without copying the results
+        
+        Returns:
+            Tuple of (documents, cacheable); the documents are shared and must
+            not be mutated, cacheable is False for Azure error fallbacks
+        """
+        # Both backends are case-insensitive, so the lowercased query is the key
+        cache_key = (query.lower(), top_k)
+        with self._search_cache_lock:
+            cached = self._search_cache.get(cache_key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached, True
+            self.cache_misses += 1
+        
+        if self._get_search_client():
+            try:
+                documents = self._search_azure(query, top_k)
+            except Exception as e:
+                # Fall back without caching, so Azure is retried next time
+                logger.error("Azure Search error: %s", e)
+                return self._search_mock(query, top_k), False
         else:
-            return self._search_mock(query, top_k)
+            documents = self._search_mock(query, top_k)
+        
+        with self._search_cache_lock:
+            self._search_cache[cache_key] = documents
+        return documents, True
+    
+    def _render_cached(self, query: str, cache_key: Tuple, top_k: int, render) -> str:
+        """Render search results for a query, reusing the output for repeats"""
+        with self._search_cache_lock:
+            rendered = self._rendered_cache.get(cache_key)
+        if rendered is not None:
+            return rendered
+        
+        # Search with the query as typed; only the cache keys are lowercased
+        documents, cacheable = self._search_shared(query, top_k)
+        rendered = render(documents)
+        if cacheable:
+            with self._search_cache_lock:
+                self._rendered_cache[cache_key] = rendered
+        return rendered
+    
+    def get_cache_stats(self) -> Dict:
+        """Get search cache statistics"""
+        with self._search_cache_lock:
+            self._search_cache.expire()
+            self._rendered_cache.expire()
+            return {
+                'entries': len(self._search_cache),
+                'rendered_entries': len(self._rendered_cache),
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'evictions': self._search_cache.evictions
+            }
     
     def _search_azure(self, query: str, top_k: int) -> List[Dict]:
-        """Search using Azure AI Search"""
-        try:
-            results = self.search_client.search(
-                search_text=query,
-                top=top_k,
-                include_total_count=True
-            )
-            
-            documents = []
-            for result in results:
-                documents.append({
-                    "content": result.get("content", ""),
-                    "title": result.get("title", ""),
-                    "score": result.get("@search.score", 0),
-                    "metadata": {
-                        "source": result.get("source", "unknown"),
-                        "category": result.get("category", "general")
-                    }
-                })
-            
-            logger.info(f"Azure Search returned {len(documents)} results for query: {query}")
-            return documents
+        """Search using Azure AI Search; raises on service errors"""
+        results = self.search_client.search(
+            search_text=query,
+            top=top_k,
+            select=SEARCH_SELECT_FIELDS
+        )
         
-        except Exception as e:
-            logger.error(f"Azure Search error: {e}")
-            return self._search_mock(query, top_k)
+        # The pager fetches lazily; never read past the first top_k results
+        documents = []
+        for result in islice(results, top_k):
+            documents.append({
+                "content": result.get("content", ""),
+                "title": result.get("title", ""),
+                "score": result.get("@search.score", 0),
+                "metadata": {
+                    "source": result.get("source", "unknown"),
+                    "category": result.get("category", "general")
+                }
+            })
+        
+        logger.info("Azure Search returned %d results for query: %s", len(documents), query)
+        return documents
     
     def _search_mock(self, query: str, top_k: int) -> List[Dict]:
-        """Mock search for testing without Azure"""
-        logger.info(f"[MOCK RAG] Searching for: {query}")
+        """Mock search for testing without Azure; returns the shared documents, uncopied"""
+        logger.info("[MOCK RAG] Searching for: %s", query)
         
-        # Base de conocimiento mock
-        mock_knowledge = [
-            {
-                "content": "SOPHIA es un agente de IA multi-tenant para operaciones de ciberseguridad. Puede analizar alertas de seguridad, proporcionar inteligencia de amenazas y coordinar la respuesta a incidentes.",
-                "title": "Resumen de SOPHIA",
-                "score": 0.95,
-                "metadata": {"source": "documentation", "category": "sophia"}
-            },
-            {
-                "content": "Un firewall es un sistema de seguridad de red que monitorea y controla el tráfico entrante y saliente basándose en reglas de seguridad predeterminadas. Actúa como una barrera entre una red interna confiable y redes externas no confiables como Internet. Los firewalls pueden ser de hardware, software o una combinación de ambos. Funciones principales: filtrado de paquetes, inspección de estado, prevención de intrusiones y control de aplicaciones.",
-                "title": "¿Qué es un Firewall?",
-                "score": 0.92,
-                "metadata": {"source": "education", "category": "concepts"}
-            },
-            {
-                "content": "Para bloquear una dirección IP, necesitas configurar reglas de firewall. Esta acción requiere aprobación de VictorIA para cumplir con las políticas de seguridad.",
-                "title": "Procedimientos de Bloqueo de IP",
-                "score": 0.88,
-                "metadata": {"source": "security-procedures", "category": "procedures"}
-            },
-            {
-                "content": "Un IDS (Sistema de Detección de Intrusiones) es una herramienta de seguridad que monitorea el tráfico de red en busca de actividades sospechosas y violaciones de políticas. A diferencia de un firewall que bloquea el tráfico, un IDS solo detecta y alerta sobre amenazas. Un IPS (Sistema de Prevención de Intrusiones) va un paso más allá al detectar Y bloquear automáticamente las amenazas.",
-                "title": "IDS vs IPS",
-                "score": 0.90,
-                "metadata": {"source": "education", "category": "concepts"}
-            },
-            {
-                "content": "Un ataque DDoS (Distributed Denial of Service) es un intento malicioso de interrumpir el tráfico normal de un servidor, servicio o red inundándolo con tráfico de Internet. Los ataques DDoS utilizan múltiples sistemas comprometidos como fuentes de tráfico de ataque. Las defensas incluyen rate limiting, filtrado de tráfico, CDN y servicios anti-DDoS especializados.",
-                "title": "Ataques DDoS",
-                "score": 0.89,
-                "metadata": {"source": "education", "category": "threats"}
-            },
-            {
-                "content": "Las alertas de seguridad pueden obtenerse desde Palo Alto Networks, Splunk, Wazuh y otras herramientas de seguridad integradas.",
-                "title": "Fuentes de Alertas de Seguridad",
-                "score": 0.82,
-                "metadata": {"source": "integrations", "category": "alerts"}
-            },
-            {
-                "content": "Las acciones de seguridad de alto riesgo como cuarentena de dispositivos, aislamiento de red o apagado de sistemas requieren aprobación manual a través de escalación a VictorIA.",
-                "title": "Política de Escalación de Acciones de Seguridad",
-                "score": 0.79,
-                "metadata": {"source": "policies", "category": "escalation"}
-            },
-            {
-                "content": "Las métricas del sistema y datos de rendimiento pueden monitorearse a través de dashboards de Grafana. Las métricas clave incluyen CPU, memoria, uso de disco y throughput de red.",
-                "title": "Monitoreo de Sistemas",
-                "score": 0.75,
-                "metadata": {"source": "monitoring", "category": "metrics"}
-            },
-            {
-                "content": "Un ransomware es un tipo de malware que cifra los archivos de la víctima y exige un pago (rescate) para restaurar el acceso. Las medidas preventivas incluyen: backups regulares, actualizaciones de seguridad, educación de usuarios, segmentación de red y sistemas de detección de comportamiento anómalo.",
-                "title": "Ransomware",
-                "score": 0.87,
-                "metadata": {"source": "education", "category": "threats"}
-            },
-            {
-                "content": "La autenticación multifactor (MFA) es un método de seguridad que requiere que los usuarios proporcionen dos o más factores de verificación para acceder a un recurso. Los factores pueden ser: algo que sabes (contraseña), algo que tienes (token/teléfono), o algo que eres (biometría). MFA reduce significativamente el riesgo de acceso no autorizado.",
-                "title": "Autenticación Multifactor (MFA)",
-                "score": 0.86,
-                "metadata": {"source": "education", "category": "concepts"}
-            }
-        ]
         
         # Improved keyword matching with scoring
-        query_lower = query.lower()
-        query_words = query_lower.split()
+        features = _analyze_query(query)
+        query_lower = features.lower
+        query_words = features.words
+        
+        if not query_words:
+            # Empty, "*" or stopword-only queries: no keyword, concept phrase or
+            # category bonus can apply, only the same exact phrase bonus for every
+            # matching document, so the ranking is knowledge base order
+            relevant_docs = [_MOCK_INDEX[i].doc for i in _mock_postings(query_lower)][:top_k]
+            return relevant_docs if relevant_docs else list(_MOCK_KNOWLEDGE[:top_k])
+        
+        is_concept_question = features.is_concept_question
+        asks_metrics = features.asks_metrics
+        asks_alerts = features.asks_alerts
         scored_docs = []
         
-        for doc in mock_knowledge:
-            doc_text = (doc["content"] + " " + doc["title"]).lower()
-            
-            # Calculate relevance score based on keyword matches
-            match_count = sum(1 for word in query_words if word in doc_text and len(word) > 2)
-            
-            # Bonus for exact phrase match
-            if query_lower in doc_text:
-                match_count += 10
-            
+        # Calculate relevance score based on keyword matches
+        match_counts = [0] * len(_MOCK_INDEX)
+        for word in query_words:
+            for i in _mock_postings(word):
+                match_counts[i] += 1
+        
+        # Bonus for exact phrase match
+        for i in _mock_postings(query_lower):
+            match_counts[i] += 10
+        
+        for mock, match_count in zip(_MOCK_INDEX, match_counts):
             # Bonus for category match
-            if 'métrica' in query_lower and doc['metadata']['category'] == 'metrics':
-                match_count += 5
-            elif 'alert' in query_lower and doc['metadata']['category'] == 'alerts':
+            if (asks_metrics and mock.is_metrics) or (asks_alerts and mock.is_alerts):
                 match_count += 5
             
             # Priority boost for educational/conceptual content when user asks "what is" questions
-            if any(phrase in query_lower for phrase in ['qué es', 'que es', 'what is', 'cómo funciona', 'explica', 'explain']):
-                if doc['metadata']['category'] in ['concepts', 'education', 'threats']:
-                    match_count += 15  # Strong boost for educational content
-                elif doc['metadata']['category'] in ['procedures']:
-                    match_count -= 5   # Reduce procedural content for conceptual questions
+            if is_concept_question:
+                match_count += mock.concept_bonus
             
             if match_count > 0:
-                scored_docs.append((doc, match_count))
+                scored_docs.append((mock.doc, match_count))
         
-        # Sort by match count (descending) and return top-k
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
-        relevant_docs = [doc for doc, _ in scored_docs[:top_k]]
+        # Top-k by match count (descending); ties keep knowledge base order
+        top_docs = heapq.nlargest(top_k, scored_docs, key=itemgetter(1))
+        relevant_docs = [doc for doc, _ in top_docs]
         
         # Return relevant docs or top-k from knowledge base
-        return relevant_docs if relevant_docs else mock_knowledge[:top_k]
+        return relevant_docs if relevant_docs else list(_MOCK_KNOWLEDGE[:top_k])
     
     def get_context(self, query: str, max_tokens: int = 2000) -> str:
         """
@@ -201,23 +401,27 @@ class RAGTool:
         Returns:
             Formatted context string
         """
-        documents = self.search(query, top_k=5)
-        
+        return self._render_cached(
+            query,
+            ('context', query.lower(), max_tokens),
+            5,
+            lambda documents: self._format_context(documents, max_tokens)
+        )
+    
+    def _format_context(self, documents: List[Dict], max_tokens: int) -> str:
+        """Format search results as a context string"""
         if not documents:
             return "No se encontró información relevante en la base de conocimiento."
         
-        context_parts = ["**Información Relevante:**\n"]
-        total_chars = 0
         max_chars = max_tokens * 4  # Rough approximation
+        doc_texts = [
+            f"\n**{doc['title']}** (relevance: {doc['score']:.2f})\n{doc['content']}\n"
+            for doc in documents
+        ]
+        # Keep the leading documents whose running length fits the budget
+        fitting = bisect_right(list(accumulate(map(len, doc_texts))), max_chars)
         
-        for doc in documents:
-            doc_text = f"\n**{doc['title']}** (relevance: {doc['score']:.2f})\n{doc['content']}\n"
-            if total_chars + len(doc_text) > max_chars:
-                break
-            context_parts.append(doc_text)
-            total_chars += len(doc_text)
-        
-        return "\n".join(context_parts)
+        return "\n".join(["**Información Relevante:**\n", *doc_texts[:fitting]])
     
     def generate_natural_response(self, query: str) -> str:
         """
@@ -229,37 +433,44 @@ class RAGTool:
         Returns:
             Natural language response
         """
-        documents = self.search(query, top_k=3)
-        
+        return self._render_cached(
+            query,
+            ('response', query.lower()),
+            3,
+            lambda documents: self._compose_natural_response(query, documents)
+        )
+    
+    def _compose_natural_response(self, query: str, documents: List[Dict]) -> str:
+        """Pick a conversational reply from the search results"""
         if not documents:
             return "Lo siento, no tengo información sobre eso en este momento. ¿Hay algo más en lo que pueda ayudarte?"
         
-        query_lower = query.lower()
+        topic = _analyze_query(query).topic
         
         # Detectar tipo de pregunta y generar respuesta apropiada
-        if any(word in query_lower for word in ['nombre', 'llamas', 'eres', 'quien', 'quién']):
+        if topic == 'identity':
             # Pregunta sobre identidad
             for doc in documents:
                 if 'sophia' in doc['title'].lower() or 'sophia' in doc['content'].lower():
                     return f"Soy SOPHIA, un agente de IA multi-tenant para operaciones de ciberseguridad. Puedo analizar alertas de seguridad, proporcionar inteligencia de amenazas y coordinar la respuesta a incidentes. ¿En qué puedo ayudarte?"
         
-        elif any(word in query_lower for word in ['alertas', 'alert', 'avisos', 'notificaciones']):
+        elif topic == 'alerts':
             # Pregunta sobre alertas
             for doc in documents:
                 if 'alert' in doc['content'].lower() or 'alert' in doc['title'].lower():
                     return f"Puedo ayudarte con las alertas de seguridad. {doc['content']}"
             return "Puedo ayudarte con las alertas de seguridad. Las alertas de seguridad pueden obtenerse desde Palo Alto Networks, Splunk, Wazuh y otras herramientas de seguridad integradas."
         
-        elif any(word in query_lower for word in ['bloque', 'bloquear', 'firewall']):
+        elif topic == 'block':
             # Pregunta sobre bloqueo
             for doc in documents:
-                if 'bloque' in doc['content'].lower() or 'firewall' in doc['content'].lower():
+                if _BLOCK_DOC_RE.search(doc['content'].lower()):
                     return doc['content']
         
-        elif any(word in query_lower for word in ['métrica', 'monitoreo', 'rendimiento', 'cpu', 'memoria', 'sistema']):
+        elif topic == 'metrics':
             # Pregunta sobre métricas
             for doc in documents:
-                if 'métrica' in doc['content'].lower() or 'monitoreo' in doc['content'].lower() or 'sistema' in doc['content'].lower():
+                if _METRICS_DOC_RE.search(doc['content'].lower()):
                     return doc['content']
         
         # Respuesta genérica basada en el documento más relevante
@@ -0,0 +1,46 @@
+"""
+Request body and audit event schemas for the SOPHIA API
+Decoded, validated and encoded with msgspec
+"""
+
+from typing import Annotated, Any, Optional
+
+import msgspec
+
+NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class ChatRequest(msgspec.Struct, rename='camel'):
+    """Body of /chat and /chat/stream"""
+    company_id: int
+    user_id: int
+    message: NonEmptyStr
+    agent_access_key: NonEmptyStr
+    thread_id: Optional[str] = None
+
+
+class ConfigTestRequest(msgspec.Struct, rename='camel'):
+    """Body of /config/test"""
+    company_id: int
+    agent_access_key: NonEmptyStr
+
+
+class CacheInvalidateRequest(msgspec.Struct, rename='camel'):
+    """Body of /cache/invalidate; without companyId every cache is cleared"""
+    company_id: Optional[int] = None
+
+
+class ChatAuditPayload(msgspec.Struct):
+    """Audit payload of a SOPHIA chat exchange"""
+    company_id: int
+    user_id: int
+    intent: Optional[str]
+    message_length: int
+
+
+class AuditEvent(msgspec.Struct):
+    """Audit event as posted to the backend's /agents/audit endpoints"""
+    action: str
+    entity_type: str
+    entity_id: Optional[str]
+    payload: Any
@@ -1,5 +1,33 @@
 from typing import Dict, Any
-import requests
+from sophia.backend import backend_session
+
+_TOOL_DEFINITION = {
+    "type": "function",
+    "function": {
+        "name": "create_ticket",
+        "description": "Create a ticket to hand off infrastructure, provisioning, or action requests to VICTORIA agent",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "Brief title describing the action needed"
+                },
+                "description": {
+                    "type": "string",
+                    "description": "Detailed description of what the user needs (include context from conversation)"
+                },
+                "priority": {
+                    "type": "string",
+                    "enum": ["low", "medium", "high", "critical"],
+                    "description": "Priority level based on urgency"
+                }
+            },
+            "required": ["title", "description", "priority"]
+        }
+    }
+}
+
 
 class CreateTicketTool:
     """Tool for creating tickets to hand off to VICTORIA agent"""
@@ -31,7 +59,7 @@ class CreateTicketTool:
             Created ticket information
         """
         try:
-            response = requests.post(
+            response = backend_session.post(
                 f"{self.backend_url}/victoria/report",
                 headers={"Authorization": f"Bearer {auth_token}"},
                 json={
@@ -69,30 +97,5 @@ class CreateTicketTool:
             }
     
     def get_tool_definition(self) -> Dict[str, Any]:
-        """Return tool definition for Azure AI Agent Framework"""
-        return {
-            "type": "function",
-            "function": {
-                "name": "create_ticket",
-                "description": "Create a ticket to hand off infrastructure, provisioning, or action requests to VICTORIA agent",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "title": {
-                            "type": "string",
-                            "description": "Brief title describing the action needed"
-                        },
-                        "description": {
-                            "type": "string",
-                            "description": "Detailed description of what the user needs (include context from conversation)"
-                        },
-                        "priority": {
-                            "type": "string",
-                            "enum": ["low", "medium", "high", "critical"],
-                            "description": "Priority level based on urgency"
-                        }
-                    },
-                    "required": ["title", "description", "priority"]
-                }
-            }
-        }
+        """Return tool definition for Azure AI Agent Framework (shared; do not modify)"""
+        return _TOOL_DEFINITION
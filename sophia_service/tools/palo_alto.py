@@ -1,11 +1,40 @@
 from typing import Dict, Any
-import requests
+import copy
+import threading
+from config import CountingTTLCache
+from sophia.backend import backend_session
+
+# Successful status checks are reused for this long
+READ_CACHE_TTL_SECONDS = 10
+READ_CACHE_MAX_ENTRIES = 256
+
+_TOOL_DEFINITION = {
+    "type": "function",
+    "function": {
+        "name": "palo_alto_status",
+        "description": "Check Palo Alto firewall system status and health",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "integration_id": {
+                    "type": "integer",
+                    "description": "The Palo Alto integration ID from the backend"
+                }
+            },
+            "required": ["integration_id"]
+        }
+    }
+}
+
 
 class PaloAltoTool:
     """Tool for checking Palo Alto firewall status (read-only)"""
     
-    def __init__(self, backend_url: str):
+    def __init__(self, backend_url: str, cache_enabled: bool = True):
         self.backend_url = backend_url
+        self.cache_enabled = cache_enabled
+        self._cache = CountingTTLCache(maxsize=READ_CACHE_MAX_ENTRIES, ttl=READ_CACHE_TTL_SECONDS)
+        self._cache_lock = threading.Lock()
     
     def get_status(self, company_id: int, integration_id: int, auth_token: str) -> Dict[str, Any]:
         """
@@ -19,8 +48,26 @@ class PaloAltoTool:
         Returns:
             Firewall status information
         """
+        if not self.cache_enabled:
+            return self._get_status(company_id, integration_id, auth_token)
+        
+        # The token is part of the key: access is checked per user by the backend
+        cache_key = (company_id, integration_id, auth_token)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        result = self._get_status(company_id, integration_id, auth_token)
+        if result["success"]:
+            with self._cache_lock:
+                self._cache[cache_key] = copy.deepcopy(result)
+        return result
+    
+    def _get_status(self, company_id: int, integration_id: int, auth_token: str) -> Dict[str, Any]:
+        """Call the backend, uncached"""
         try:
-            response = requests.post(
+            response = backend_session.post(
                 f"{self.backend_url}/integrations/{integration_id}/execute",
                 headers={"Authorization": f"Bearer {auth_token}"},
                 json={
@@ -52,21 +99,5 @@ class PaloAltoTool:
             }
     
     def get_tool_definition(self) -> Dict[str, Any]:
-        """Return tool definition for Azure AI Agent Framework"""
-        return {
-            "type": "function",
-            "function": {
-                "name": "palo_alto_status",
-                "description": "Check Palo Alto firewall system status and health",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "integration_id": {
-                            "type": "integer",
-                            "description": "The Palo Alto integration ID from the backend"
-                        }
-                    },
-                    "required": ["integration_id"]
-                }
-            }
-        }
+        """Return tool definition for Azure AI Agent Framework (shared; do not modify)"""
+        return _TOOL_DEFINITION
@@ -1,6 +1,43 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+import copy
+import threading
+from collections import OrderedDict
+from itertools import islice
 from azure.search.documents import SearchClient
 from azure.core.credentials import AzureKeyCredential
+from config import CountingTTLCache
+
+# Search results reused for repeated (index, query, top_k) lookups
+SEARCH_CACHE_MAX_ENTRIES = 1000
+SEARCH_CACHE_TTL_SECONDS = 300
+# Least recently used index clients are dropped beyond this many
+SEARCH_CLIENT_MAX_INDEXES = 64
+# Index fields read from search results
+SEARCH_SELECT_FIELDS = ["content", "metadata", "title"]
+
+_TOOL_DEFINITION = {
+    "type": "function",
+    "function": {
+        "name": "rag_search",
+        "description": "Search the company's security knowledge base for relevant documentation and information",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query to find relevant documentation"
+                },
+                "top_k": {
+                    "type": "integer",
+                    "description": "Number of results to return (default 5)",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        }
+    }
+}
+
 
 class RAGSearchTool:
     """Tool for searching company-specific vector stores"""
@@ -8,6 +45,21 @@ class RAGSearchTool:
     def __init__(self, search_endpoint: str, search_key: str):
         self.search_endpoint = search_endpoint
         self.search_key = search_key
+        # One SearchClient per index, reused across searches (LRU order)
+        self._search_clients: OrderedDict[str, SearchClient] = OrderedDict()
+        self._credential = None
+        self._lock = threading.Lock()
+        self._results_cache = CountingTTLCache(
+            maxsize=SEARCH_CACHE_MAX_ENTRIES,
+            ttl=SEARCH_CACHE_TTL_SECONDS
+        )
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    @staticmethod
+    def _cache_key(index_name: str, query: str, top_k: int) -> Tuple[str, str, int]:
+        # Full-text search ignores case and extra whitespace
+        return index_name, ' '.join(query.lower().split()), top_k
     
     def search(self, company_id: int, vector_store_id: str, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -31,29 +83,22 @@ class RAGSearchTool:
                 }]
             
             index_name = f"company-{company_id}-{vector_store_id}"
+            cache_key = self._cache_key(index_name, query, top_k)
             
-            search_client = SearchClient(
-                endpoint=self.search_endpoint,
-                index_name=index_name,
-                credential=AzureKeyCredential(self.search_key)
-            )
-            
-            results = search_client.search(
-                search_text=query,
-                top=top_k,
-                select=["content", "metadata", "title"]
-            )
+            with self._lock:
+                documents = self._results_cache.get(cache_key)
+                if documents is None:
+                    self.cache_misses += 1
+                else:
+                    self.cache_hits += 1
             
-            documents = []
-            for result in results:
-                documents.append({
-                    "content": result.get("content", ""),
-                    "title": result.get("title", ""),
-                    "score": result.get("@search.score", 0.0),
-                    "metadata": result.get("metadata", {})
-                })
+            if documents is None:
+                documents = self._search_index(index_name, query, top_k)
+                with self._lock:
+                    self._results_cache[cache_key] = documents
             
-            return documents if documents else [{
+            # Callers get copies; the cached list is never handed out
+            return copy.deepcopy(documents) if documents else [{
                 "content": "No relevant documents found in knowledge base.",
                 "score": 0.0,
                 "metadata": {}
@@ -66,27 +111,64 @@ class RAGSearchTool:
                 "metadata": {"error": True}
             }]
     
-    def get_tool_definition(self) -> Dict[str, Any]:
-        """Return tool definition for Azure AI Agent Framework"""
-        return {
-            "type": "function",
-            "function": {
-                "name": "rag_search",
-                "description": "Search the company's security knowledge base for relevant documentation and information",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "The search query to find relevant documentation"
-                        },
-                        "top_k": {
-                            "type": "integer",
-                            "description": "Number of results to return (default 5)",
-                            "default": 5
-                        }
-                    },
-                    "required": ["query"]
-                }
+    def _search_index(self, index_name: str, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Query an Azure Search index; raises on service errors"""
+        results = self._get_client(index_name).search(
+            search_text=query,
+            top=top_k,
+            select=SEARCH_SELECT_FIELDS
+        )
+        
+        # The pager fetches lazily; never read past the first top_k results
+        documents = []
+        for result in islice(results, top_k):
+            documents.append({
+                "content": result.get("content", ""),
+                "title": result.get("title", ""),
+                "score": result.get("@search.score", 0.0),
+                "metadata": result.get("metadata", {})
+            })
+        
+        return documents
+    
+    def _get_client(self, index_name: str) -> SearchClient:
+        """Get the SearchClient for an index, creating it on first use"""
+        with self._lock:
+            search_client = self._search_clients.get(index_name)
+            if search_client is not None:
+                self._search_clients.move_to_end(index_name)
+                return search_client
+            
+            if self._credential is None:
+                self._credential = AzureKeyCredential(self.search_key)
+            search_client = SearchClient(
+                endpoint=self.search_endpoint,
+                index_name=index_name,
+                credential=self._credential
+            )
+            self._search_clients[index_name] = search_client
+            # Evicted clients are not closed: another thread may still be using one
+            while len(self._search_clients) > SEARCH_CLIENT_MAX_INDEXES:
+                self._search_clients.popitem(last=False)
+            return search_client
+    
+    def invalidate(self, index_name: str):
+        """Drop cached results for an index, e.g. after its documents change"""
+        with self._lock:
+            for cache_key in [key for key in self._results_cache.keys() if key[0] == index_name]:
+                self._results_cache.pop(cache_key, None)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get search cache statistics"""
+        with self._lock:
+            self._results_cache.expire()
+            return {
+                'entries': len(self._results_cache),
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'evictions': self._results_cache.evictions
             }
-        }
+    
+    def get_tool_definition(self) -> Dict[str, Any]:
+        """Return tool definition for Azure AI Agent Framework (shared; do not modify)"""
+        return _TOOL_DEFINITION
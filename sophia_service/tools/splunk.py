@@ -1,5 +1,28 @@
 from typing import Dict, Any
-import requests
+from sophia.backend import backend_session
+
+_TOOL_DEFINITION = {
+    "type": "function",
+    "function": {
+        "name": "splunk_query",
+        "description": "Execute read-only Splunk queries to search security logs and events",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "integration_id": {
+                    "type": "integer",
+                    "description": "The Splunk integration ID from the backend"
+                },
+                "query": {
+                    "type": "string",
+                    "description": "Splunk search query (SPL syntax)"
+                }
+            },
+            "required": ["integration_id", "query"]
+        }
+    }
+}
+
 
 class SplunkTool:
     """Tool for querying Splunk (read-only)"""
@@ -21,7 +44,7 @@ class SplunkTool:
             Query results
         """
         try:
-            response = requests.post(
+            response = backend_session.post(
                 f"{self.backend_url}/integrations/{integration_id}/execute",
                 headers={"Authorization": f"Bearer {auth_token}"},
                 json={
@@ -57,25 +80,5 @@ class SplunkTool:
             }
     
     def get_tool_definition(self) -> Dict[str, Any]:
-        """Return tool definition for Azure AI Agent Framework"""
-        return {
-            "type": "function",
-            "function": {
-                "name": "splunk_query",
-                "description": "Execute read-only Splunk queries to search security logs and events",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "integration_id": {
-                            "type": "integer",
-                            "description": "The Splunk integration ID from the backend"
-                        },
-                        "query": {
-                            "type": "string",
-                            "description": "Splunk search query (SPL syntax)"
-                        }
-                    },
-                    "required": ["integration_id", "query"]
-                }
-            }
-        }
+        """Return tool definition for Azure AI Agent Framework (shared; do not modify)"""
+        return _TOOL_DEFINITION
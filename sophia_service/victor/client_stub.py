@@ -3,6 +3,7 @@ VictorIA Client Stub
 Placeholder for future VictorIA integration
 """
 
+import hashlib
 import logging
 from typing import Dict, Optional
 from .ticket_models import TicketDraft
@@ -18,11 +19,15 @@ def send_ticket_to_victoria(ticket: TicketDraft) -> Dict:
     For now, it just logs and returns a mock response
     """
     logger.info(f"[VICTORIA STUB] Would send ticket to VictorIA: {ticket.subject}")
-    logger.debug(f"[VICTORIA STUB] Ticket details: {ticket.to_dict()}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"[VICTORIA STUB] Ticket details: {ticket.to_dict()}")
+    
+    # Stable across processes, unlike hash() under hash randomization
+    subject_digest = hashlib.blake2b(ticket.subject.encode('utf-8'), digest_size=4).hexdigest()
     
     return {
         "status": "pending",
-        "ticket_id": f"STUB-{ticket.company_id}-{hash(ticket.subject) % 10000}",
+        "ticket_id": f"STUB-{ticket.company_id}-{subject_digest}",
         "message": "Ticket created (stub mode - VictorIA not yet integrated)",
         "estimated_response_time": "15 minutes"
     }
@@ -7,7 +7,7 @@ from typing import Optional, Dict, List
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class TicketDraft:
     """Draft ticket for VictorIA escalation"""
     subject: str
@@ -33,7 +33,11 @@ class TicketDraft:
         }
 
 
-@dataclass
+# Action types whose tickets are at least high severity
+HIGH_SEVERITY_ACTIONS = frozenset({"block_ip", "quarantine_device", "shutdown_system"})
+
+
+@dataclass(slots=True)
 class ActionRequest:
     """Action request from user"""
     intent: str
@@ -41,3 +45,16 @@ class ActionRequest:
     parameters: Dict = field(default_factory=dict)
     original_message: str = ""
     requires_escalation: bool = False
+    # Ticket severity; derived from the fields above unless given
+    severity: Optional[str] = None
+    
+    def __post_init__(self):
+        if self.severity is None:
+            if self.requires_escalation:
+                self.severity = "critical"
+            elif self.action_type in HIGH_SEVERITY_ACTIONS:
+                self.severity = "high"
+            elif self.intent == "action":
+                self.severity = "medium"
+            else:
+                self.severity = "low"
@@ -11,9 +11,12 @@ fi
 echo "Starting TxDxAI services..."
 
 # Start Backend API with Gunicorn (Port 5000)
+# Threaded workers: requests are I/O bound (PostgreSQL, Key Vault, providers)
 echo "Starting Backend API on port 5000..."
 gunicorn --bind 0.0.0.0:5000 \
-  --workers 2 \
+  --worker-class gthread \
+  --workers ${BACKEND_WORKERS:-2} \
+  --threads ${BACKEND_THREADS:-8} \
   --timeout 120 \
   --access-logfile - \
   --error-logfile - \
@@ -23,9 +26,16 @@ BACKEND_PID=$!
 echo "Backend started with PID: $BACKEND_PID"
 
 # Start SOPHIA Service with Gunicorn (Port 8000)
+# A single worker process keeps conversation threads and caches (held in
+# memory) consistent between requests; concurrency comes from threads.
+# Client connections are kept alive between chats instead of being closed
+# after every response
 echo "Starting SOPHIA service on port 8000..."
 gunicorn --bind 0.0.0.0:8000 \
-  --workers 2 \
+  --worker-class gthread \
+  --workers 1 \
+  --threads ${SOPHIA_THREADS:-32} \
+  --keep-alive ${SOPHIA_KEEPALIVE:-30} \
   --timeout 120 \
   --access-logfile - \
   --error-logfile - \
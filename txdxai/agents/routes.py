@@ -1,10 +1,10 @@
 from flask import request, jsonify
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt
 from datetime import timedelta, datetime
 from txdxai.agents import agents_bp
 from txdxai.extensions import db
-from txdxai.db.models import AgentInstance
-from txdxai.common.errors import UnauthorizedError, ValidationError
+from txdxai.db.models import AgentInstance, AuditLog
+from txdxai.common.errors import UnauthorizedError, ValidationError, ForbiddenError
 from txdxai.security.keys import verify_access_key
 from txdxai.common.utils import log_audit
 from txdxai.integrations.keyvault import retrieve_secret
@@ -140,3 +140,68 @@ def get_agent_instance_metadata(instance_id):
         'status': instance.status,
         'settings': instance.settings
     }), 200
+
+
+MAX_AUDIT_BATCH_SIZE = 500
+
+
+def _record_agent_audit(events):
+    """Store audit events sent by an agent service, in a single commit"""
+    claims = get_jwt()
+    
+    if 'agent:invoke' not in claims.get('scopes', []):
+        raise ForbiddenError('Agent scope required')
+    
+    audits = []
+    for event in events:
+        if not isinstance(event, dict) or not event.get('action') or not event.get('entity_type'):
+            raise ValidationError('Each audit event requires action and entity_type')
+        if not isinstance(event.get('payload') or {}, dict):
+            raise ValidationError('Audit event payload must be an object')
+        
+        payload = dict(event.get('payload') or {})
+        payload['company_id'] = claims.get('company_id')
+        payload['agent_instance_id'] = claims.get('agent_instance_id')
+        
+        entity_id = event.get('entity_id')
+        audits.append(AuditLog(
+            action=event['action'],
+            entity_type=event['entity_type'],
+            entity_id=str(entity_id) if entity_id is not None else None,
+            payload=payload
+        ))
+    
+    db.session.add_all(audits)
+    db.session.commit()
+    
+    return jsonify({'recorded': len(audits)}), 201
+
+
+@agents_bp.route('/audit', methods=['POST'])
+@jwt_required()
+def agent_audit():
+    """
+    Endpoint for agent services to record one audit event
+    Requires agent JWT token with agent:invoke scope
+    """
+    data = request.get_json()
+    if not data:
+        raise ValidationError('Request body is required')
+    
+    return _record_agent_audit([data])
+
+
+@agents_bp.route('/audit/batch', methods=['POST'])
+@jwt_required()
+def agent_audit_batch():
+    """
+    Endpoint for agent services to record several audit events at once
+    Requires agent JWT token with agent:invoke scope
+    """
+    data = request.get_json()
+    if not isinstance(data, list) or not data:
+        raise ValidationError('A non-empty list of audit events is required')
+    if len(data) > MAX_AUDIT_BATCH_SIZE:
+        raise ValidationError(f'At most {MAX_AUDIT_BATCH_SIZE} audit events per batch')
+    
+    return _record_agent_audit(data)
@@ -1,5 +1,5 @@
 import requests
-from flask import request, jsonify
+from flask import request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from txdxai.chat import chat_bp
 from txdxai.common.errors import ValidationError, TxDxAIError, UnauthorizedError
@@ -11,27 +11,12 @@ import os
 
 SOPHIA_SERVICE_URL = os.environ.get('SOPHIA_SERVICE_URL', 'http://localhost:8000')
 
-@chat_bp.route('/chat', methods=['POST'])
-@jwt_required()
-def proxy_chat():
+def _authorize_chat_request():
     """
-    Proxy endpoint that forwards chat requests to SOPHIA microservice.
+    Validate the caller and agent access key of a chat request
     
-    Security:
-    1. Validates user authentication (JWT)
-    2. Validates agent access key against bcrypt hash
-    3. Enforces ACTIVE status requirement
-    4. Verifies company and user authorization
-    5. Forwards request to SOPHIA service on port 8000
-    
-    Request body:
-    {
-        "companyId": 1,
-        "userId": 1,
-        "agentAccessKey": "...",
-        "message": "user message",
-        "threadId": "optional-thread-id"
-    }
+    Returns:
+        The request body to forward to SOPHIA
     """
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
@@ -85,6 +70,33 @@ def proxy_chat():
         'message_preview': data.get('message')[:50] if len(data.get('message', '')) > 50 else data.get('message')
     })
     
+    return data
+
+
+@chat_bp.route('/chat', methods=['POST'])
+@jwt_required()
+def proxy_chat():
+    """
+    Proxy endpoint that forwards chat requests to SOPHIA microservice.
+    
+    Security:
+    1. Validates user authentication (JWT)
+    2. Validates agent access key against bcrypt hash
+    3. Enforces ACTIVE status requirement
+    4. Verifies company and user authorization
+    5. Forwards request to SOPHIA service on port 8000
+    
+    Request body:
+    {
+        "companyId": 1,
+        "userId": 1,
+        "agentAccessKey": "...",
+        "message": "user message",
+        "threadId": "optional-thread-id"
+    }
+    """
+    data = _authorize_chat_request()
+    
     try:
         sophia_response = requests.post(
             f'{SOPHIA_SERVICE_URL}/chat',
@@ -105,3 +117,54 @@ def proxy_chat():
         raise TxDxAIError('Cannot connect to SOPHIA service', 503)
     except Exception as e:
         raise TxDxAIError(f'Error communicating with SOPHIA: {str(e)}', 500)
+
+
+@chat_bp.route('/chat/stream', methods=['POST'])
+@jwt_required()
+def proxy_chat_stream():
+    """
+    Proxy endpoint that streams SOPHIA's /chat/stream Server-Sent Events.
+    
+    Same security checks and request body as /api/chat. Events are relayed
+    as they arrive, so the client sees the start of long answers without
+    waiting for the full response.
+    """
+    data = _authorize_chat_request()
+    
+    try:
+        sophia_response = requests.post(
+            f'{SOPHIA_SERVICE_URL}/chat/stream',
+            json=data,
+            headers={'Content-Type': 'application/json'},
+            timeout=30,
+            stream=True
+        )
+    except requests.exceptions.Timeout:
+        raise TxDxAIError('SOPHIA service timeout', 504)
+    except requests.exceptions.ConnectionError:
+        raise TxDxAIError('Cannot connect to SOPHIA service', 503)
+    except Exception as e:
+        raise TxDxAIError(f'Error communicating with SOPHIA: {str(e)}', 500)
+    
+    if sophia_response.status_code != 200:
+        error_body = sophia_response.content
+        sophia_response.close()
+        return Response(
+            error_body,
+            status=sophia_response.status_code,
+            content_type=sophia_response.headers.get('content-type', 'application/json')
+        )
+    
+    def relay():
+        try:
+            # chunk_size=None yields each network read as soon as it arrives
+            for chunk in sophia_response.iter_content(chunk_size=None):
+                yield chunk
+        finally:
+            sophia_response.close()
+    
+    return Response(
+        stream_with_context(relay()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )